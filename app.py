@@ -1,20 +1,8 @@
-from flask import Flask
-from pymongo import MongoClient
+from flask import Flask, render_template
 from flask_restx import Api
-from routes import auth
-from routes import photo
-from routes import album
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 import os
-from flask import render_template, send_from_directory
-
-app = Flask(__name__)
-
-load_dotenv()
-
-mongo_uri = os.getenv('MONGODB_URI')
-client = MongoClient(mongo_uri)
-db = client['albumate']
 
 authorizations = {
     'Bearer Auth': {
@@ -25,60 +13,100 @@ authorizations = {
     }
 }
 
-app.config['RESTX_MASK_SWAGGER'] = False # 필드 마스크 비활성화
 
-api = Api(
-    app,
-    version='0.1',
-    title='Photo App API',
-    description='사진 공유 앱의 API 서버',
-    terms_url='/',
-    doc='/swagger/',
-    authorizations=authorizations,
-    security='Bearer Auth',
-    mask=False          # 필드 마스크 비활성화
-)
-
-api.add_namespace(auth.auth_ns, path='/api/auth')
-api.add_namespace(album.album_ns, path='/api/albums')
-api.add_namespace(photo.photo_ns, path='/api/photos')
+def create_app(config=None):
+    """
+    앱 생성. DB 연결/스레드 풀/캐시 등은 첫 사용 시(워커 프로세스에서) 만들어지므로,
+    gunicorn preload로 마스터에서 한 번 import한 뒤 fork해도 워커끼리 연결을 공유하지 않는다.
+    """
+    load_dotenv()
+
+    # 라우트 모듈은 모듈 수준에서 설정값(os.getenv)을 읽으므로 .env 로드 이후에 import
+    from routes import auth
+    from routes import photo
+    from routes import album
+    from utils import metrics
+    from utils.static_files import send_upload
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config['RESTX_MASK_SWAGGER'] = False # 필드 마스크 비활성화
+    # 앞단 프록시(nginx 등) 수. 설정하면 X-Forwarded-For/Proto의 마지막 N개 값을 신뢰해 remote_addr에 반영
+    app.config['TRUSTED_PROXY_COUNT'] = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+    if config:
+        app.config.update(config)
+
+    proxies = app.config['TRUSTED_PROXY_COUNT']
+    if proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
+    api = Api(
+        app,
+        version='0.1',
+        title='Photo App API',
+        description='사진 공유 앱의 API 서버',
+        terms_url='/',
+        doc='/swagger/',
+        authorizations=authorizations,
+        security='Bearer Auth',
+        mask=False          # 필드 마스크 비활성화
+    )
+
+    api.add_namespace(auth.auth_ns, path='/api/auth')
+    api.add_namespace(album.album_ns, path='/api/albums')
+    api.add_namespace(photo.photo_ns, path='/api/photos')
+
+    metrics.init_app(app)  # 엔드포인트별 지연 시간/DB 명령 수, /metrics
+
+    # 인덱스 생성은 요청 경로 밖에서 실행 (gunicorn.conf.py when_ready, 또는 python -m models.indexes)
+    # 큰 컬렉션에서는 createIndexes가 gunicorn timeout보다 오래 걸려 첫 요청의 워커가 종료될 수 있음
+
+    app.add_url_rule('/login', 'login', login)
+    app.add_url_rule('/signup', 'signup', signup)
+    app.add_url_rule('/home', 'home', home)
+    app.add_url_rule('/album/<album_id>', 'album_detail_page', album_detail_page)
+    app.add_url_rule('/photo/<photo_id>', 'photo_detail_page', photo_detail_page)
+    app.add_url_rule('/invitations', 'invitations_page', invitations_page)
+    app.add_url_rule('/uploads/<path:filename>', 'uploaded_file', send_upload)
+
+    # Swagger 스펙은 여기서 한 번 만들어 캐시 (preload 시 마스터에서 만들어 워커가 공유)
+    with app.test_request_context():
+        api.__schema__
+
+    return app
 
 # @app.route('/')
 # def home():
 #     return "환영합니다! API 문서는 /swagger/에서 확인하세요."
 
-@app.route("/login")
 def login():
     return render_template("login.html")
 
 
-@app.route("/signup")
 def signup():
     return render_template("signup.html")
 
 
-@app.route("/home")
 def home():
     return render_template("home.html")
 
 
-@app.route("/album/<album_id>")
 def album_detail_page(album_id):
     return render_template("album.html", album_id=album_id)
 
 
-@app.route("/photo/<photo_id>")
 def photo_detail_page(photo_id):
     return render_template("photo.html", photo_id=photo_id)
 
-@app.route("/invitations")
+
 def invitations_page():
     return render_template("invitations.html")
 
-@app.route('/uploads/<path:filename>')
-def uploaded_file(filename):
-    uploads_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'uploads'))
-    return send_from_directory(uploads_dir, filename)
+
+app = create_app()  # gunicorn app:app
 
 if __name__ == '__main__':
+    if os.getenv('INDEX_BOOTSTRAP', '1') == '1':
+        from models.indexes import ensure_indexes
+        ensure_indexes()
     app.run(debug=True)
@@ -0,0 +1,77 @@
+"""
+응답 직렬화 벤치마크: 기존 make_response(이중 인코딩) vs utils.serializer
+
+    python -m benchmarks.bench_serializer [--items 2000] [--repeat 50]
+"""
+from bson import ObjectId
+from datetime import datetime
+from json import JSONEncoder
+import argparse
+import gzip
+import json
+import timeit
+
+from utils import serializer
+
+
+def sample_payload(items):
+    now = datetime.utcnow()
+    return [{
+        'album_id': ObjectId(),
+        'title': f'앨범 {i}',
+        'description': '여행 사진 모음',
+        'created_at': now,
+        'is_owner': i % 3 == 0,
+        'member_count': i % 50,
+        'photo_count': i * 7,
+        'cover': {'photo_id': ObjectId(), 'filename': f'{i:064x}.jpg'},
+        'last_activity_at': now,
+    } for i in range(items)]
+
+
+def legacy_encode(data):
+    """변경 전 경로: 라우트의 str()/isoformat() 변환 + data 문자열 인코딩 + 봉투 재인코딩"""
+    data = [{
+        **item,
+        'album_id': str(item['album_id']),
+        'created_at': item['created_at'].isoformat() + 'Z',
+        'cover': {'photo_id': str(item['cover']['photo_id']), 'filename': item['cover']['filename']},
+        'last_activity_at': item['last_activity_at'].isoformat() + 'Z',
+    } for item in data]
+
+    def convert_datetime(obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        raise TypeError("Type not serializable")
+
+    encoded = JSONEncoder(default=convert_datetime).encode(data)
+    return json.dumps({'code': 200, 'message': 'ok', 'data': encoded}).encode('utf-8')
+
+
+def new_encode(data):
+    return serializer.dumps({'code': 200, 'message': 'ok', 'data': data})
+
+
+def stream_encode(data):
+    return b''.join(serializer.iter_envelope(200, 'ok', data))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    data = sample_payload(args.items)
+    print(f'serializer backend: {serializer.backend()}, items={args.items}, repeat={args.repeat}')
+    for name, fn in (('legacy (double encode)', legacy_encode),
+                     ('serializer.dumps', new_encode),
+                     ('serializer.iter_envelope', stream_encode)):
+        seconds = timeit.timeit(lambda: fn(data), number=args.repeat) / args.repeat
+        body = fn(data)
+        print(f'{name:26} {seconds * 1000:8.2f} ms/op  {len(body):>9} bytes  '
+              f'gzip {len(gzip.compress(body, 5)):>8} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,589 @@
+"""
+API 부하 테스트 / 벤치마크
+
+    python -m benchmarks.load_test --db albumate_bench [--backend mongo|mongomock] [--url http://localhost:8000]
+        [--concurrency 8] [--requests 200] [--only photos.list,albums.dashboard]
+        [--save-baseline benchmarks/baselines/local.json]
+        [--baseline benchmarks/baselines/local.json --tolerance 0.2]
+
+- --db 로 지정한 DB를 비우고 seed.py로 데이터를 만든 뒤 routes/의 모든 엔드포인트를 호출한다.
+  실수로 운영 DB를 지우지 않도록 이름이 bench로 시작하거나 끝나는 DB만 허용한다 (MONGODB_DB 환경 변수는 무시).
+- 기본은 같은 프로세스의 test_client로 호출하며, 요청당 DB 명령 수를 함께 측정한다
+  (mongo: pymongo CommandListener, mongomock: 컬렉션 메서드 호출 수).
+  mongomock은 스레드 안전하지 않아 --concurrency 1 로 실행하는 것이 좋다 (지연 시간도 실제 MongoDB와 다름).
+  캐시 TTL/동기화 주기는 측정 중 만료되지 않도록 길게 잡아, DB 명령 수가 실행 속도와 관계없이 같게 나오도록 한다.
+- --url 을 주면 실행 중인 서버에 HTTP로 요청한다. DB 명령 수는 측정하지 않으며,
+  서버와 같은 MONGODB_URI / SECRET_KEY 를 사용하고, 서버의 MONGODB_DB 를 --db 와 같게 띄워야 한다.
+- 결과(처리량, p50/p95/p99, 요청당 DB 명령 수)를 JSON으로 저장하고, 이전 결과와 비교해
+  p95가 tolerance 이상 느려지거나 DB 명령 수가 늘어난 시나리오가 있으면 종료 코드 1을 반환한다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from pymongo import monitoring
+
+from benchmarks import seed as seeding
+
+EXPECTED_STATUS = {200, 201, 207, 304}
+BENCH_DB_MARKER = 'bench'
+
+
+def is_bench_db(name):
+    """비워도 되는 벤치마크 전용 DB 이름인지 (bench로 시작하거나 끝남)"""
+    name = name.lower()
+    return name.startswith(BENCH_DB_MARKER) or name.endswith(BENCH_DB_MARKER)
+
+
+class QueryCounter(monitoring.CommandListener):
+    """요청을 처리한 스레드 기준으로 DB 명령 수를 센다 (test_client는 호출한 스레드에서 요청을 처리)"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+    def incr(self):
+        self._local.count = self.count + 1
+
+    def started(self, event):
+        self.incr()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+MONGOMOCK_METHODS = (
+    'find', 'find_one', 'find_one_and_update', 'find_one_and_delete', 'find_one_and_replace',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'bulk_write', 'aggregate', 'count_documents', 'distinct',
+)
+
+
+def count_mongomock_calls(counter):
+    """mongomock 컬렉션 메서드 호출 수를 센다 (메서드 내부에서 다시 호출하는 경우는 한 번으로)"""
+    from mongomock.collection import Collection
+    depth = threading.local()
+
+    def wrap(original):
+        def wrapper(self, *args, **kwargs):
+            level = getattr(depth, 'level', 0)
+            if level == 0:
+                counter.incr()
+            depth.level = level + 1
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                depth.level = level
+        return wrapper
+
+    for name in MONGOMOCK_METHODS:
+        setattr(Collection, name, wrap(getattr(Collection, name)))
+
+
+def setup_backend(backend, counter):
+    import models.db
+    if backend == 'mongomock':
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit('--backend mongomock 을 사용하려면 mongomock을 설치해야 합니다.')
+        count_mongomock_calls(counter)
+        models.db._client = mongomock.MongoClient()
+        models.db._client_pid = os.getpid()
+    else:
+        monitoring.register(counter)  # 이후 생성되는 MongoClient에 적용
+    db = models.db.get_db()
+    if not is_bench_db(db.name):
+        raise SystemExit(f'{db.name} 은 벤치마크 DB 이름이 아니라서 비우지 않습니다 (bench로 시작하거나 끝나야 함).')
+    db.client.drop_database(db.name)
+    return db
+
+
+def encode_multipart(form, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in form.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content in files:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode())
+        body.write(content)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, spec):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        kwargs = {'method': spec['method'], 'headers': spec.get('headers')}
+        if spec.get('files'):
+            data = dict(spec.get('form') or {})
+            for name, filename, content in spec['files']:
+                data.setdefault(name, []).append((io.BytesIO(content), filename))
+            kwargs.update(data=data, content_type='multipart/form-data')
+        elif spec.get('json') is not None:
+            kwargs['json'] = spec['json']
+        response = client.open(spec['path'], **kwargs)
+        body = response.get_data()  # 스트리밍 응답도 끝까지 읽음
+        response.close()
+        return response.status_code, response.headers, body
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, spec):
+        headers = dict(spec.get('headers') or {})
+        data = None
+        if spec.get('files'):
+            data, headers['Content-Type'] = encode_multipart(spec.get('form') or {}, spec['files'])
+        elif spec.get('json') is not None:
+            data = json.dumps(spec['json']).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + spec['path'], data=data, headers=headers, method=spec['method'])
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+
+class BenchContext:
+    def __init__(self, db, client, seeded, image_size):
+        self.db = db
+        self.client = client
+        self.user_ids = seeded['user_ids']
+        self.large_album_id = seeded['large_album_id']
+        self.small_album_ids = seeded['small_album_ids']
+        self._base_image = make_image(image_size)
+        self._image_counter = 0
+        self._lock = threading.Lock()
+        self._tokens = {}
+
+    def headers(self, user_id):
+        from routes.auth import create_tokens
+        token = self._tokens.get(user_id)
+        if token is None:
+            token = self._tokens[user_id] = create_tokens(str(user_id))[0]
+        return {'Authorization': f'Bearer {token}'}
+
+    def image(self):
+        """내용 해시가 모두 다르도록 JPEG 끝(EOI 뒤)에 일련번호를 붙인 이미지"""
+        with self._lock:
+            self._image_counter += 1
+            counter = self._image_counter
+        return self._base_image + counter.to_bytes(8, 'big')
+
+    def album_owner(self, album_id):
+        return self.db['albums'].find_one({'_id': album_id}, {'owner_id': 1})['owner_id']
+
+    def user(self, i):
+        return self.user_ids[i % len(self.user_ids)]
+
+
+def make_image(size):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (90, 140, 200)).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+# --- 시나리오: (ctx, n) -> 요청 n개 (준비 작업은 측정에서 제외) ---
+
+def auth_register(ctx, n):
+    return [{'method': 'POST', 'path': '/api/auth/register', 'json': {
+        'username': f'new-{uuid.uuid4().hex}@albumate.test', 'password': seeding.PASSWORD,
+        'nickname': f'new-{uuid.uuid4().hex[:12]}'}} for _ in range(n)]
+
+
+def auth_login(ctx, n):
+    return [{'method': 'POST', 'path': '/api/auth/login', 'json': {
+        'username': seeding.username(i % len(ctx.user_ids)), 'password': seeding.PASSWORD}} for i in range(n)]
+
+
+def auth_logout(ctx, n):
+    from routes.auth import create_tokens
+    specs = []
+    for i in range(n):
+        token = create_tokens(str(ctx.user(i)))[0]
+        specs.append({'method': 'POST', 'path': '/api/auth/logout', 'headers': {'Authorization': f'Bearer {token}'}})
+    return specs
+
+
+def auth_nickname_check(ctx, n):
+    return [{'method': 'POST', 'path': '/api/auth/nickname-check', 'expect': {200, 409}, 'json': {
+        'value': f'bench{i}' if i % 2 else f'free-{i}'}} for i in range(n)]
+
+
+def auth_email_check(ctx, n):
+    return [{'method': 'POST', 'path': '/api/auth/email-check', 'expect': {200, 409}, 'json': {
+        'value': seeding.username(i) if i % 2 else f'free-{i}@albumate.test'}} for i in range(n)]
+
+
+def auth_user_info(ctx, n):
+    return [{'method': 'GET', 'path': f'/api/auth/{ctx.user(i)}', 'headers': ctx.headers(ctx.user(i))}
+            for i in range(n)]
+
+
+def albums_create(ctx, n):
+    return [{'method': 'POST', 'path': '/api/albums/', 'headers': ctx.headers(ctx.user(i)), 'json': {
+        'title': f'album {i}', 'description': 'bench',
+        'invite_emails': [seeding.username(i + k) for k in range(1, 6)]}} for i in range(n)]
+
+
+def albums_invite(ctx, n):
+    owner_id = ctx.album_owner(ctx.large_album_id)
+    return [{'method': 'POST', 'path': f'/api/albums/{ctx.large_album_id}/invite',
+             'headers': ctx.headers(owner_id),
+             'json': {'invite_emails': [seeding.username(i * 10 + k) for k in range(10)]}} for i in range(n)]
+
+
+def albums_dashboard(ctx, n):
+    return [{'method': 'GET', 'path': '/api/albums/dashboard', 'headers': ctx.headers(ctx.user(i))} for i in range(n)]
+
+
+def albums_invitations(ctx, n):
+    return [{'method': 'GET', 'path': '/api/albums/invitations', 'headers': ctx.headers(ctx.user(i))}
+            for i in range(n)]
+
+
+def _invited_pool(ctx, n):
+    """새 앨범 하나에 n명을 초대해 두고 (invite_token, 초대받은 유저 목록) 반환"""
+    owner_id = ctx.user_ids[0]
+    album_id = seeding.insert_album(ctx.db, owner_id)
+    invitees = [ctx.user(i) for i in range(1, n + 1)]
+    return seeding.insert_invitations(ctx.db, album_id, owner_id, invitees), invitees
+
+
+def albums_accept(ctx, n):
+    token, invitees = _invited_pool(ctx, n)
+    return [{'method': 'POST', 'path': f'/api/albums/invitations/{token}/accept', 'headers': ctx.headers(user_id)}
+            for user_id in invitees]
+
+
+def albums_reject(ctx, n):
+    token, invitees = _invited_pool(ctx, n)
+    return [{'method': 'POST', 'path': f'/api/albums/invitations/{token}/reject', 'headers': ctx.headers(user_id)}
+            for user_id in invitees]
+
+
+def albums_my(ctx, n):
+    return [{'method': 'GET', 'path': f'/api/albums/{ctx.user(i)}/my', 'headers': ctx.headers(ctx.user(i))}
+            for i in range(n)]
+
+
+def albums_members(ctx, n):
+    headers = ctx.headers(ctx.user_ids[0])
+    return [{'method': 'GET', 'path': f'/api/albums/{ctx.large_album_id}/members?skip={(i % 5) * 200}',
+             'headers': headers} for i in range(n)]
+
+
+def albums_leave(ctx, n):
+    members = [ctx.user(i) for i in range(1, n + 1)]
+    album_id = seeding.insert_album(ctx.db, ctx.user_ids[0], members)
+    return [{'method': 'POST', 'path': f'/api/albums/{album_id}/leave', 'headers': ctx.headers(user_id)}
+            for user_id in members]
+
+
+def albums_detail(ctx, n):
+    return [{'method': 'GET', 'path': f'/api/albums/{ctx.small_album_ids[i % len(ctx.small_album_ids)]}',
+             'headers': ctx.headers(ctx.user(i))} for i in range(n)]
+
+
+def albums_delete(ctx, n):
+    specs = []
+    for i in range(n):
+        owner_id = ctx.user(i)
+        album_id = seeding.insert_album(ctx.db, owner_id)
+        specs.append({'method': 'DELETE', 'path': f'/api/albums/{album_id}', 'headers': ctx.headers(owner_id)})
+    return specs
+
+
+def albums_job(ctx, n):
+    from models.job import Job
+    owner_id = ctx.user_ids[0]
+    job_id = Job(ctx.db).enqueue('delete_album', {'album_id': ctx.large_album_id, 'requested_by': owner_id})
+    return [{'method': 'GET', 'path': f'/api/albums/jobs/{job_id}', 'headers': ctx.headers(owner_id)} for _ in range(n)]
+
+
+def photos_upload(ctx, n):
+    album_id = ctx.small_album_ids[0]
+    headers = ctx.headers(ctx.album_owner(album_id))
+    return [{'method': 'POST', 'path': '/api/photos/', 'headers': headers, 'form': {'album_id': str(album_id)},
+             'files': [('file', f'bench_{i}.jpg', ctx.image())]} for i in range(n)]
+
+
+def photos_batch(ctx, n, files_per_request=10):
+    album_id = ctx.small_album_ids[1 % len(ctx.small_album_ids)]
+    headers = ctx.headers(ctx.album_owner(album_id))
+    return [{'method': 'POST', 'path': '/api/photos/batch', 'headers': headers, 'form': {'album_id': str(album_id)},
+             'files': [('files', f'bench_{i}_{k}.jpg', ctx.image()) for k in range(files_per_request)]}
+            for i in range(n)]
+
+
+def photos_list(ctx, n):
+    headers = ctx.headers(ctx.user_ids[0])
+    specs = []
+    for i in range(n):
+        sort = 'newest' if i % 2 else 'oldest'
+        specs.append({'method': 'GET', 'path': f'/api/photos/?album_id={ctx.large_album_id}&limit=100&sort={sort}',
+                      'headers': headers})
+    return specs
+
+
+def photos_detail(ctx, n):
+    photo_ids = [doc['_id'] for doc in ctx.db['photos'].find(
+        {'album_id': str(ctx.large_album_id)}, {'_id': 1}).limit(n)]
+    headers = ctx.headers(ctx.user_ids[0])
+    return [{'method': 'GET', 'path': f'/api/photos/{photo_ids[i % len(photo_ids)]}', 'headers': headers}
+            for i in range(n)]
+
+
+def photos_delete(ctx, n):
+    owner_id = ctx.user_ids[0]
+    album_id = seeding.insert_album(ctx.db, owner_id, photo_count=n)
+    headers = ctx.headers(owner_id)
+    return [{'method': 'DELETE', 'path': f'/api/photos/{doc["_id"]}', 'headers': headers}
+            for doc in ctx.db['photos'].find({'album_id': str(album_id)}, {'_id': 1})]
+
+
+def uploads_get(ctx, n):
+    spec = photos_upload(ctx, 1)[0]
+    status, _, body = ctx.client.send(spec)
+    if status != 201:
+        raise RuntimeError(f'업로드 실패: {status} {body[:200]!r}')
+    url = urlsplit(json.loads(body)['url'])
+    path = f'{url.path}?{url.query}' if url.query else url.path
+    return [{'method': 'GET', 'path': path} for _ in range(n)]
+
+
+SCENARIOS = {
+    'auth.register': auth_register,
+    'auth.login': auth_login,
+    'auth.logout': auth_logout,
+    'auth.nickname_check': auth_nickname_check,
+    'auth.email_check': auth_email_check,
+    'auth.user_info': auth_user_info,
+    'albums.create': albums_create,
+    'albums.invite': albums_invite,
+    'albums.dashboard': albums_dashboard,
+    'albums.invitations': albums_invitations,
+    'albums.accept': albums_accept,
+    'albums.reject': albums_reject,
+    'albums.my': albums_my,
+    'albums.members': albums_members,
+    'albums.leave': albums_leave,
+    'albums.detail': albums_detail,
+    'albums.delete': albums_delete,
+    'albums.job': albums_job,
+    'photos.upload': photos_upload,
+    'photos.batch': photos_batch,
+    'photos.list': photos_list,
+    'photos.detail': photos_detail,
+    'photos.delete': photos_delete,
+    'uploads.get': uploads_get,
+}
+
+
+def percentile(sorted_values, p):
+    """nearest-rank 방식 백분위수"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(client, counter, specs, concurrency, count_queries):
+    def send(spec):
+        counter.reset()
+        started = time.perf_counter()
+        try:
+            status = client.send(spec)[0]
+        except Exception:
+            status = None
+        ok = status in spec.get('expect', EXPECTED_STATUS)
+        return time.perf_counter() - started, status, ok, counter.count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(send, specs))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    errors = [status for _, status, ok, _ in samples if not ok]
+    return {
+        'requests': len(samples),
+        'errors': len(errors),
+        'error_statuses': sorted({str(status) for status in errors}),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_per_request': round(sum(sample[3] for sample in samples) / len(samples), 2) if count_queries else None,
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms=5.0, query_slack=0.05):
+    """
+    baseline 대비 p95가 tolerance 이상 느려졌거나 요청당 DB 명령 수가 늘어난 시나리오 목록.
+    몇 ms짜리 요청의 흔들림이나 측정 중 캐시 TTL 만료로 생기는 간헐적인 명령 1~2개는
+    min_delta_ms / query_slack 이하의 차이로 보고 무시한다
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance) \
+                and result['p95_ms'] - before['p95_ms'] > min_delta_ms:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if None not in (before.get('queries_per_request'), result['queries_per_request']) \
+                and result['queries_per_request'] > before['queries_per_request'] + query_slack:
+            regressions.append(
+                f"{name}: queries/request {before['queries_per_request']} -> {result['queries_per_request']}")
+        if result['errors'] > before.get('errors', 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {result['errors']}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<22}{'req':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}")
+    for name, r in results.items():
+        queries = '-' if r['queries_per_request'] is None else r['queries_per_request']
+        print(f"{name:<22}{r['requests']:>6}{r['errors']:>5}{r['throughput_rps']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{queries:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Albumate API 부하 테스트')
+    parser.add_argument('--db', required=True,
+                        help='비우고 시드할 벤치마크 DB 이름 (bench로 시작하거나 끝나야 함, 예: albumate_bench)')
+    parser.add_argument('--backend', choices=['mongo', 'mongomock'], default='mongo')
+    parser.add_argument('--url', help='실행 중인 서버 주소 (없으면 같은 프로세스에서 test_client 사용)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='시나리오별 요청 수')
+    parser.add_argument('--warmup', type=int, default=10, help='시나리오별 측정 전 요청 수')
+    parser.add_argument('--only', help='실행할 시나리오 (쉼표로 구분)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--albums', type=int, default=200)
+    parser.add_argument('--large-album-members', type=int, default=1000)
+    parser.add_argument('--large-album-photos', type=int, default=5000)
+    parser.add_argument('--photos-per-album', type=int, default=50)
+    parser.add_argument('--invites-per-user', type=int, default=5)
+    parser.add_argument('--image-size', default='1600x1200', help='업로드 이미지 크기 (WxH)')
+    parser.add_argument('--save-baseline', help='결과를 저장할 JSON 경로')
+    parser.add_argument('--baseline', help='비교할 baseline JSON 경로')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='허용할 p95 증가 비율')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='이보다 작은 p95 증가는 무시')
+    parser.add_argument('--query-slack', type=float, default=0.05, help='이보다 작은 요청당 DB 명령 수 증가는 무시')
+    args = parser.parse_args()
+    if not is_bench_db(args.db):
+        parser.error(f'--db {args.db}: 실행 전에 DB를 비우므로 bench로 시작하거나 끝나는 이름만 사용할 수 있습니다.')
+
+    # 앱 import 전에 설정 (실제 DB/업로드 폴더를 건드리지 않도록)
+    os.environ['MONGODB_DB'] = args.db
+    os.environ.setdefault('SECRET_KEY', 'albumate-bench')
+    os.environ.setdefault('INDEX_BOOTSTRAP', '0')
+    os.environ.setdefault('LOGIN_IP_LIMIT', str(10 ** 9))
+    os.environ.setdefault('REGISTER_IP_LIMIT', str(10 ** 9))
+    # 요청당 DB 명령 수가 실행 시간(TTL 만료, 주기적 동기화 횟수)에 따라 달라지지 않도록 측정 중에는 만료시키지 않음
+    for name in ('RESPONSE_CACHE_TTL', 'PROFILE_CACHE_TTL', 'IDENTITY_CACHE_TTL',
+                 'REVOCATION_SYNC_INTERVAL', 'AVAILABILITY_SYNC_INTERVAL'):
+        os.environ.setdefault(name, '86400')
+    if not args.url:
+        import tempfile
+        os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='albumate-bench-'))
+
+    names = args.only.split(',') if args.only else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'알 수 없는 시나리오: {", ".join(unknown)}')
+
+    counter = QueryCounter()
+    db = setup_backend(args.backend, counter)
+    started = time.perf_counter()
+    seeded = seeding.seed(db, users=args.users, albums=args.albums,
+                          large_album_members=args.large_album_members,
+                          large_album_photos=args.large_album_photos,
+                          photos_per_album=args.photos_per_album,
+                          invites_per_user=args.invites_per_user)
+    print(f'seeded in {time.perf_counter() - started:.1f}s')
+
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        from app import app
+        from routes.auth import availability_index
+        # 가입 가능 여부 filter는 백그라운드에서 만들어지므로 측정 전에 미리 만들어 둠 (조회 수가 실행마다 달라지지 않게)
+        availability_index.rebuild()
+        client = InProcessClient(app)
+    width, height = (int(value) for value in args.image_size.lower().split('x'))
+    ctx = BenchContext(db, client, seeded, (width, height))
+
+    results = {}
+    for name in names:
+        specs = SCENARIOS[name](ctx, args.warmup + args.requests)
+        for spec in specs[:args.warmup]:
+            client.send(spec)
+        results[name] = run_scenario(client, counter, specs[args.warmup:], args.concurrency,
+                                     count_queries=not args.url)
+    print_table(results)
+
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'backend': 'http' if args.url else args.backend,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'users': args.users,
+            'albums': args.albums,
+            'large_album_members': args.large_album_members,
+            'large_album_photos': args.large_album_photos,
+        },
+        'results': results,
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms, args.query_slack)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
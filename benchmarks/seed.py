@@ -0,0 +1,124 @@
+"""
+부하 테스트용 데이터 생성 (API를 거치지 않고 컬렉션에 bulk insert)
+
+- 유저 N명 (비밀번호 해시는 한 번만 계산해 공유)
+- 큰 앨범 1개: 멤버 수천 명, 사진 수천 장
+- 작은 앨범 여러 개: 멤버 2~10명, 사진 수십 장
+- 유저마다 대기 중인 초대 몇 건
+"""
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from models.indexes import ensure_indexes
+from utils.hashing import password_hasher
+import hashlib
+import random
+import uuid
+
+PASSWORD = 'bench-password'
+BATCH_SIZE = 5000
+
+
+def username(i):
+    return f'bench{i}@albumate.test'
+
+
+def _insert_many(collection, docs):
+    for start in range(0, len(docs), BATCH_SIZE):
+        collection.insert_many(docs[start:start + BATCH_SIZE], ordered=False)
+
+
+def _photo_filename(album_id, i):
+    return hashlib.sha256(f'{album_id}:{i}'.encode()).hexdigest() + '.jpg'
+
+
+def insert_album(db, owner_id, member_ids=(), photo_count=0, uploader_ids=None, rng=random):
+    """요약 값(member_count/photo_count/cover)까지 채운 앨범 생성, album_id 반환"""
+    now = datetime.now(timezone.utc)
+    album_id = ObjectId()
+    member_ids = [owner_id] + [user_id for user_id in member_ids if user_id != owner_id]
+    uploader_ids = uploader_ids or member_ids
+
+    photos = []
+    for i in range(photo_count):
+        photos.append({
+            '_id': ObjectId(),
+            'album_id': str(album_id),
+            'user_id': str(rng.choice(uploader_ids)),
+            'filename': _photo_filename(album_id, i),
+            'original_filename': f'IMG_{i:05d}.jpg',
+            'content_hash': None,
+            'created_at': (now - timedelta(seconds=photo_count - i)).replace(microsecond=0),
+        })
+    cover = {'photo_id': photos[-1]['_id'], 'filename': photos[-1]['filename']} if photos else None
+
+    db['albums'].insert_one({
+        '_id': album_id,
+        'owner_id': owner_id,
+        'title': f'bench album {album_id}',
+        'description': '부하 테스트용 앨범',
+        'invite_token': str(uuid.uuid4()),
+        'created_at': now,
+        'member_count': len(member_ids),
+        'photo_count': photo_count,
+        'cover': cover,
+        'last_activity_at': now,
+        'summary_version': 1,
+        'version': 1,
+    })
+    _insert_many(db['album_members'], [
+        {'album_id': album_id, 'user_id': user_id, 'joined_at': now + timedelta(milliseconds=i)}
+        for i, user_id in enumerate(member_ids)
+    ])
+    if photos:
+        _insert_many(db['photos'], photos)
+    return album_id
+
+
+def insert_invitations(db, album_id, from_user_id, to_user_ids):
+    album = db['albums'].find_one({'_id': album_id}, {'invite_token': 1})
+    now = datetime.now(timezone.utc)
+    _insert_many(db['album_invitations'], [{
+        'album_id': album_id,
+        'from_user_id': from_user_id,
+        'to_user_id': user_id,
+        'invite_token': album['invite_token'],
+        'status': 'pending',
+        'created_at': now,
+    } for user_id in to_user_ids])
+    return album['invite_token']
+
+
+def seed(db, users=1000, albums=200, large_album_members=1000, large_album_photos=5000,
+         photos_per_album=50, invites_per_user=5, seed_value=1):
+    """데이터 생성 후 부하 테스트에서 사용할 id 목록을 dict로 반환"""
+    rng = random.Random(seed_value)
+    ensure_indexes(db)
+
+    password = password_hasher.hash(PASSWORD)
+    user_ids = [ObjectId() for _ in range(users)]
+    _insert_many(db['users'], [
+        {'_id': user_id, 'username': username(i), 'password': password, 'nickname': f'bench{i}'}
+        for i, user_id in enumerate(user_ids)
+    ])
+
+    large_album_id = insert_album(
+        db, user_ids[0], user_ids[:large_album_members], large_album_photos, rng=rng)
+
+    small_album_ids = []
+    for _ in range(albums - 1):
+        owner_id = rng.choice(user_ids)
+        members = rng.sample(user_ids, rng.randint(1, 9))
+        small_album_ids.append(insert_album(db, owner_id, members, photos_per_album, rng=rng))
+
+    # 앨범마다 초대 대상이 겹치지 않도록 유저를 돌아가며 배정 ((album_id, to_user_id) unique)
+    invite_albums = small_album_ids[:invites_per_user]
+    for album_id in invite_albums:
+        album = db['albums'].find_one({'_id': album_id}, {'owner_id': 1})
+        members = {m['user_id'] for m in db['album_members'].find({'album_id': album_id}, {'user_id': 1})}
+        insert_invitations(db, album_id, album['owner_id'], [u for u in user_ids if u not in members])
+
+    return {
+        'user_ids': user_ids,
+        'large_album_id': large_album_id,
+        'small_album_ids': small_album_ids,
+    }
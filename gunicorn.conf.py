@@ -0,0 +1,97 @@
+"""
+gunicorn 설정 (gunicorn -c gunicorn.conf.py app:app)
+
+GUNICORN_WORKER_CLASS=gevent (또는 -k gevent) 로 실행하면 비동기 모드:
+Mongo/디스크 I/O 대기 중 다른 요청을 처리하므로 워커 하나가 수백 개의 요청을 동시에 유지한다.
+(pymongo는 gevent monkey patch와 호환되어 모델 코드를 바꾸지 않아도 I/O가 협력적으로 동작)
+비밀번호 해시처럼 CPU를 쓰는 작업은 gevent의 OS 스레드 풀에서 실행된다 (utils/hashing.py).
+기본 sync 워커에서는 초대 알림 스트림(SSE)이 연결을 유지하지 않고 한 번 응답한 뒤 재연결을 기다리게 한다
+(routes/album.py can_hold_stream). 실시간 알림이 필요하면 gevent로 실행한다.
+"""
+import gc
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+def _cli_worker_class():
+    """
+    명령행/GUNICORN_CMD_ARGS의 -k, --worker-class 값.
+    이 파일은 명령행 옵션이 적용되기 전에 실행되므로, preload 전에 gevent patch 여부를 정하려면 직접 확인해야 한다
+    """
+    for args in (sys.argv[1:], shlex.split(os.getenv('GUNICORN_CMD_ARGS', ''))):
+        for i, arg in enumerate(args):
+            if arg in ('-k', '--worker-class') and i + 1 < len(args):
+                return args[i + 1]
+            if arg.startswith('--worker-class='):
+                return arg.split('=', 1)[1]
+            if arg.startswith('-k') and len(arg) > 2:
+                return arg[2:]
+    return None
+
+
+bind = os.getenv('BIND', '0.0.0.0:5050')
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_class = _cli_worker_class() or os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# 워커별 Prometheus 값을 /metrics에서 합산하기 위한 디렉터리 (prometheus_client import 전에 설정되어야 함)
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'albumate-metrics'))
+
+try:
+    from prometheus_client import multiprocess
+except ImportError:
+    multiprocess = None
+
+
+def on_starting(server):
+    # 이전 실행의 값이 섞이지 않도록 비우고 시작
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    if preload_app and 'gevent' in server.cfg.worker_class_str and 'gevent' not in worker_class:
+        # 위에서 알아내지 못한 방식으로 gevent를 지정한 경우 (앱은 patch 없이 이미 import됨)
+        server.log.warning('gevent 워커이지만 preload 전에 monkey patch되지 않았습니다. '
+                           'GUNICORN_WORKER_CLASS=gevent 로 지정하거나 GUNICORN_PRELOAD=0 으로 실행하세요.')
+
+
+def when_ready(server):
+    # 인덱스 생성은 요청 경로(워커 timeout) 밖의 별도 프로세스에서 한 번 실행 (이미 있는 인덱스는 MongoDB가 건너뜀).
+    # 마스터는 기다리지 않고 워커를 띄운다. 서버가 여러 대면 INDEX_BOOTSTRAP=0 으로 끄고 배포 단계에서 실행
+    if os.getenv('INDEX_BOOTSTRAP', '1') == '1':
+        subprocess.Popen([sys.executable, '-m', 'models.indexes'], cwd=os.path.dirname(os.path.abspath(__file__)))
+        server.log.info('인덱스 생성 시작 (python -m models.indexes)')
+
+
+def child_exit(server, worker):
+    if multiprocess is not None:
+        multiprocess.mark_process_dead(worker.pid)
+
+
+# 마스터에서 앱을 한 번 import한 뒤 fork (워커 부팅 시간 단축, 코드/Swagger 스펙 메모리를 copy-on-write로 공유)
+# DB 연결/스레드 풀 등은 워커에서 처음 사용할 때 만들어진다 (app.create_app 참고)
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    if 'gevent' in worker_class:  # gevent 또는 gunicorn.workers.ggevent.GeventWorker
+        # 앱 모듈이 만드는 lock/Condition이 gevent용이 되도록 앱 import 전에 patch
+        from gevent import monkey
+        monkey.patch_all()
+    # preload 중 GC가 객체 헤더를 건드려 공유 페이지가 복사되지 않도록 fork 전까지 GC 중지
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()  # 마스터의 객체를 GC 대상에서 제외 (워커에서도 공유 상태 유지)
+
+
+def post_fork(server, worker):
+    # fork 이후 워커의 GC는 다시 켠다. MongoClient는 models/db.py의 register_at_fork로,
+    # 저장소/썸네일/해시 풀은 pid 확인으로 워커에서 새로 만들어진다.
+    gc.enable()
@@ -1,17 +1,65 @@
-from pymongo import MongoClient
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from datetime import datetime, timezone
+from models.db import MongoModel
+from models.user import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, User, user_albums_cache
+from utils.cache import create_cache, read_through
 import uuid
 
-client = MongoClient('mongodb://localhost:27017/')
-db = client['albumate']
+# 앨범 문서(상세/버전/소유자 확인용)와 멤버 목록 페이지 캐시.
+# 앨범 버전이 바뀌는 쓰기(invalidate_album)에서 무효화하며, 멤버 목록 key에는 버전이 포함된다
+ALBUM_CACHE_FIELDS = ('owner_id', 'title', 'description', 'created_at', 'version')
+# 요약 값(member_count/photo_count/cover)을 count로 계산해 둔 앨범 표시.
+# 이 값이 없는 이전 앨범은 $inc가 0부터 시작해 값이 틀리므로 rebuild_summary로 다시 계산한다
+SUMMARY_VERSION = 1
+album_cache = create_cache('album', maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+member_cache = create_cache('album_members', maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
 
-class Album:
-    def __init__(self):
-        self.collection = db['albums']
-        self.member_collection = db['album_members']
-        self.invite_collection = db['album_invitations']
-        self.user_collection = db['users']
+class Album(MongoModel):
+    @property
+    def collection(self):
+        return self.db['albums']
+
+    @property
+    def member_collection(self):
+        return self.db['album_members']
+
+    @property
+    def invite_collection(self):
+        return self.db['album_invitations']
+
+    @property
+    def user_collection(self):
+        return self.db['users']
+
+    @property
+    def user_service(self):
+        return User(self._db)
+
+    def get_album(self, album_id, version=None):
+        """
+        캐시된 앨범 문서 (ALBUM_CACHE_FIELDS만, 없으면 None)
+        version(get_version 결과)을 주면 캐시의 버전이 다를 때 DB에서 다시 읽는다
+        """
+        if not ObjectId.is_valid(album_id):
+            return None
+
+        def load():
+            album = self.collection.find_one({'_id': ObjectId(album_id)}, {field: 1 for field in ALBUM_CACHE_FIELDS})
+            if album:
+                album.setdefault('version', 0)
+            return album
+
+        album = read_through(album_cache, str(album_id), load)
+        if album is not None and version is not None and album['version'] != version:
+            album = load()
+            if album is not None:
+                album_cache.set(str(album_id), album)
+        return album
+
+    def invalidate_album(self, album_id):
+        album_cache.delete(str(album_id))
 
     def create_album(self, owner_id, title, description, invite_emails):
         invite_token = str(uuid.uuid4())
@@ -20,9 +68,18 @@ class Album:
             'title': title,
             'description': description,
             'invite_token': invite_token,
-            'created_at': datetime.now(timezone.utc)
+            'created_at': datetime.now(timezone.utc),
+            # 대시보드용 요약 값 (업로드/삭제/가입/탈퇴 시 $inc로 갱신)
+            'member_count': 1,
+            'photo_count': 0,
+            'cover': None,
+            'last_activity_at': datetime.now(timezone.utc),
+            'summary_version': SUMMARY_VERSION,
+            # 사진/멤버/앨범 정보가 바뀔 때마다 +1 (ETag용)
+            'version': 1
         }
         album_id = self.collection.insert_one(album_doc).inserted_id
+        self.user_service.bump_albums_version([owner_id])
 
         self.member_collection.insert_one({
             'album_id': album_id,
@@ -30,18 +87,9 @@ class Album:
             'joined_at': datetime.now(timezone.utc)
         })
 
-        users = list(self.user_collection.find({'username': {'$in': invite_emails}}))
-        for user in users:
-            self.invite_collection.insert_one({
-                'album_id': album_id,
-                'to_user_id': user['_id'],
-                'from_user_id': ObjectId(owner_id),
-                'invite_token': invite_token,
-                'status': 'pending',
-                'created_at': datetime.now(timezone.utc)
-            })
+        invitations = self._invite(album_id, ObjectId(owner_id), invite_token, invite_emails)
 
-        return {'album_id': str(album_id), 'invite_token': invite_token}
+        return {'album_id': str(album_id), 'invite_token': invite_token, 'invitations': invitations}
 
     def invite_users(self, album_id, from_user_id, invite_emails):
         album_oid = ObjectId(album_id)
@@ -49,34 +97,303 @@ class Album:
         if not album:
             return {'invited_user_ids': [], 'ignored_emails': invite_emails}
 
-        invite_token = album.get('invite_token')
-        users = list(self.user_collection.find({'username': {'$in': invite_emails}}))
-        invited = []
+        return self._invite(album_oid, ObjectId(from_user_id), album.get('invite_token'), invite_emails)
 
-        for user in users:
-            # 중복 초대 방지
-            already_invited = self.invite_collection.find_one({
-                'album_id': album_oid,
-                'to_user_id': user['_id']
-            })
-            if already_invited:
-                continue
+    def _invite(self, album_oid, from_user_oid, invite_token, invite_emails):
+        """
+        초대 대상 조회 1회 + bulk_write 1회로 초대 생성.
+        (album_id, to_user_id) unique 인덱스와 upsert로 중복 초대를 막는다.
+        """
+        invite_emails = list(dict.fromkeys(invite_emails or []))
+        users = list(self.user_collection.find({'username': {'$in': invite_emails}}, {'username': 1})) if invite_emails else []
 
-            self.invite_collection.insert_one({
-                'album_id': album_oid,
-                'to_user_id': user['_id'],
-                'from_user_id': ObjectId(from_user_id),
+        now = datetime.now(timezone.utc)
+        operations = [UpdateOne(
+            {'album_id': album_oid, 'to_user_id': user['_id']},
+            {'$setOnInsert': {
+                'from_user_id': from_user_oid,
                 'invite_token': invite_token,
                 'status': 'pending',
-                'created_at': datetime.now(timezone.utc)
-            })
-            invited.append(str(user['_id']))
+                'created_at': now
+            }},
+            upsert=True
+        ) for user in users]
+
+        upserted = set()
+        if operations:
+            try:
+                result = self.invite_collection.bulk_write(operations, ordered=False)
+                upserted = set(result.upserted_ids)
+            except BulkWriteError as e:
+                # 동시에 같은 초대가 생성된 경우(duplicate key)는 이미 초대된 것으로 처리
+                upserted = {item['index'] for item in e.details.get('upserted', [])}
+                if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                    raise
+
+        invited = [users[i] for i in sorted(upserted)]
+        self.user_service.bump_invite_version([user['_id'] for user in invited])
+        already_invited = [user for i, user in enumerate(users) if i not in upserted]
+        known_emails = {user['username'] for user in users}
 
         return {
-            'invited_user_ids': invited,
-            'ignored_emails': list(set(invite_emails) - set([u['username'] for u in users]))
+            'invited_user_ids': [str(user['_id']) for user in invited],
+            'already_invited_emails': [user['username'] for user in already_invited],
+            'ignored_emails': [email for email in invite_emails if email not in known_emails]
         }
     
+    def get_pending_invitations(self, user_id):
+        """유저가 받은 대기 중 초대 목록 (앨범/초대한 유저 정보 포함) 커서"""
+        return self.invite_collection.aggregate([
+            {'$match': {'to_user_id': ObjectId(user_id), 'status': 'pending'}},
+            {'$lookup': {
+                'from': 'albums',
+                'localField': 'album_id',
+                'foreignField': '_id',
+                'as': 'album_info'
+            }},
+            {'$unwind': '$album_info'},
+            {'$lookup': {
+                'from': 'users',
+                'localField': 'from_user_id',
+                'foreignField': '_id',
+                'as': 'from_user'
+            }},
+            {'$unwind': '$from_user'},
+            {'$project': {
+                '_id': 0,
+                'album_id': {'$toString': '$album_id'},
+                'invite_token': 1,
+                'from_user': {
+                    'user_id': {'$toString': '$from_user._id'},
+                    'nickname': '$from_user.nickname'
+                },
+                'album': {
+                    'title': '$album_info.title',
+                    'description': '$album_info.description'
+                },
+                'created_at': 1
+            }}
+        ])
+
+    def notify_pending_invitees(self, album_id):
+        """앨범 삭제 등으로 대기 중 초대가 무효가 된 유저들의 초대 버전 갱신"""
+        user_ids = self.invite_collection.distinct(
+            'to_user_id', {'album_id': ObjectId(album_id), 'status': 'pending'})
+        self.user_service.bump_invite_version(user_ids)
+
+    def get_members(self, album_id, limit=None, skip=0):
+        """
+        앨범 멤버 목록 (가입 순). 멤버 프로필은 $in 한 번(또는 프로필 캐시)으로 조회하며,
+        결과는 앨범 버전별로 캐시한다. 다른 워커의 가입/탈퇴를 놓치지 않도록 버전은 DB에서 읽는다 (get_version)
+        앨범이 없으면 None
+        """
+        version = self.get_version(album_id)
+        album = self.get_album(album_id, version) if version is not None else None
+        if not album:
+            return None
+        return read_through(
+            member_cache, f"{album_id}:{version}:{limit}:{skip}",
+            lambda: self._load_members(album, limit, skip)
+        )
+
+    def _load_members(self, album, limit, skip):
+        album_oid = album['_id']
+        cursor = self.member_collection.find(
+            {'album_id': album_oid}, {'user_id': 1, 'joined_at': 1}
+        ).sort([('joined_at', 1), ('_id', 1)]).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        members = list(cursor)
+
+        profiles = self.user_service.get_profiles([member['user_id'] for member in members])
+        result = []
+        for member in members:
+            profile = profiles.get(str(member['user_id']))
+            if not profile:
+                continue
+            result.append({
+                'user_id': member['user_id'],
+                'nickname': profile['nickname'],
+                'email': profile['username'],
+                'joined_at': member['joined_at'],
+                'is_owner': album['owner_id'] == member['user_id']
+            })
+        return result
+
+    def record_photos_added(self, album_id, photo_docs):
+        """사진 업로드 후 사진 수/대표 사진/최근 활동 시각 갱신"""
+        if not photo_docs or not ObjectId.is_valid(album_id):
+            return
+        latest = max(photo_docs, key=lambda doc: (doc['created_at'], doc['_id']))
+        self.collection.update_one(
+            {'_id': ObjectId(album_id)},
+            {
+                '$inc': {'photo_count': len(photo_docs), 'version': 1},
+                '$set': {
+                    'cover': {'photo_id': latest['_id'], 'filename': latest['filename']},
+                    'last_activity_at': datetime.now(timezone.utc)
+                }
+            }
+        )
+        self.invalidate_album(album_id)
+
+    def record_photo_removed(self, album_id, photo_id):
+        """사진 삭제 후 사진 수 갱신. 대표 사진이 삭제된 경우에만 최신 사진을 다시 조회"""
+        if not ObjectId.is_valid(album_id):
+            return
+        album = self.collection.find_one_and_update(
+            {'_id': ObjectId(album_id)},
+            {'$inc': {'photo_count': -1, 'version': 1}, '$set': {'last_activity_at': datetime.now(timezone.utc)}},
+            projection={'cover': 1}
+        )
+        if album and (album.get('cover') or {}).get('photo_id') == ObjectId(photo_id):
+            self.collection.update_one({'_id': ObjectId(album_id)}, {'$set': {'cover': self._latest_cover(album_id)}})
+        self.invalidate_album(album_id)
+
+    def add_member(self, album_id, user_id):
+        """
+        멤버 추가 후 멤버 수 갱신. 이미 멤버인 경우(초대받은 소유자, 동시 수락 등)는 아무것도 하지 않고 False.
+        (album_id, user_id) unique 인덱스가 있으므로 upsert로 처리한다.
+        """
+        album_oid = ObjectId(album_id)
+        try:
+            result = self.member_collection.update_one(
+                {'album_id': album_oid, 'user_id': ObjectId(user_id)},
+                {'$setOnInsert': {'joined_at': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        if result.upserted_id is None:
+            return False
+        self.record_member_change(album_oid, 1, user_id)
+        return True
+
+    def record_member_change(self, album_id, delta, user_id):
+        """멤버 가입(+1)/탈퇴(-1) 후 멤버 수와 해당 유저의 앨범 목록 버전 갱신"""
+        self.collection.update_one(
+            {'_id': ObjectId(album_id)},
+            {'$inc': {'member_count': delta, 'version': 1}, '$set': {'last_activity_at': datetime.now(timezone.utc)}}
+        )
+        self.invalidate_album(album_id)
+        self.user_service.bump_albums_version([user_id])
+
+    def get_version(self, album_id):
+        """
+        ETag용 앨범 버전 (_id 조회 1회, 앨범이 없으면 None).
+        memory 캐시는 워커마다 따로라 다른 워커의 쓰기를 모를 수 있으므로 항상 DB에서 읽는다
+        """
+        if not ObjectId.is_valid(album_id):
+            return None
+        album = self.collection.find_one({'_id': ObjectId(album_id)}, {'version': 1})
+        return album.get('version', 0) if album else None
+
+    def record_photo_updated(self, album_id):
+        """사진 정보(썸네일 등)가 바뀐 경우 버전만 갱신"""
+        if ObjectId.is_valid(album_id):
+            self.collection.update_one({'_id': ObjectId(album_id)}, {'$inc': {'version': 1}})
+            self.invalidate_album(album_id)
+
+    def update_album(self, album_id, changes):
+        """앨범 정보(title, description) 수정. 목록에 보이는 값이므로 멤버 전원의 앨범 목록 버전도 갱신"""
+        album_oid = ObjectId(album_id)
+        result = self.collection.update_one({'_id': album_oid}, {'$set': changes, '$inc': {'version': 1}})
+        self.invalidate_album(album_id)
+        if result.matched_count:
+            self.user_service.bump_albums_version(
+                self.member_collection.distinct('user_id', {'album_id': album_oid}))
+        return result.matched_count == 1
+
+    def _latest_cover(self, album_id):
+        latest = self.db['photos'].find_one(
+            {'album_id': str(album_id)}, {'filename': 1},
+            sort=[('created_at', -1), ('_id', -1)]
+        )
+        return {'photo_id': latest['_id'], 'filename': latest['filename']} if latest else None
+
+    def rebuild_summary(self, album_id):
+        """요약 값이 없는(이전에 생성된) 앨범의 요약을 count로 다시 계산해 저장"""
+        album_oid = ObjectId(album_id)
+        summary = {
+            'member_count': self.member_collection.count_documents({'album_id': album_oid}),
+            'photo_count': self.db['photos'].count_documents({'album_id': str(album_id)}),
+            'cover': self._latest_cover(album_id),
+        }
+        self.collection.update_one({'_id': album_oid}, {'$set': {**summary, 'summary_version': SUMMARY_VERSION}})
+        return summary
+
+    def rebuild_summaries(self, batch_size=500):
+        """요약 값을 계산한 적 없는 앨범 전체를 다시 계산 (models/summary_migrate.py). 처리한 앨범 수 반환"""
+        rebuilt = 0
+        while True:
+            albums = list(self.collection.find(
+                {'summary_version': {'$ne': SUMMARY_VERSION}}, {'_id': 1}).limit(batch_size))
+            if not albums:
+                return rebuilt
+            for album in albums:
+                self.rebuild_summary(album['_id'])
+            rebuilt += len(albums)
+
+    def get_dashboard(self, user_id):
+        """
+        유저가 속한 앨범 목록 + 멤버 수/사진 수/대표 사진/최근 활동 시각을 aggregation 한 번으로 조회
+        (최근 활동 순)
+        """
+        user_id = ObjectId(user_id)
+        albums = list(self.member_collection.aggregate([
+            {'$match': {'user_id': user_id}},
+            {'$lookup': {
+                'from': 'albums',
+                'localField': 'album_id',
+                'foreignField': '_id',
+                'as': 'album'
+            }},
+            {'$unwind': '$album'},
+            {'$replaceRoot': {'newRoot': '$album'}},
+            {'$project': {
+                'title': 1,
+                'description': 1,
+                'owner_id': 1,
+                'created_at': 1,
+                'member_count': 1,
+                'photo_count': 1,
+                'cover': 1,
+                'summary_version': 1,
+                'last_activity_at': {'$ifNull': ['$last_activity_at', '$created_at']}
+            }},
+            {'$sort': {'last_activity_at': -1, '_id': -1}}
+        ]))
+
+        result = []
+        for album in albums:
+            if album.get('summary_version') != SUMMARY_VERSION:
+                album.update(self.rebuild_summary(album['_id']))
+            cover = album.get('cover')
+            result.append({
+                'album_id': album['_id'],
+                'title': album['title'],
+                'description': album.get('description', ''),
+                'created_at': album['created_at'],
+                'is_owner': album['owner_id'] == user_id,
+                'member_count': album.get('member_count', 0),
+                'photo_count': album.get('photo_count', 0),
+                'cover': {'photo_id': cover['photo_id'], 'filename': cover['filename']} if cover else None,
+                'last_activity_at': album['last_activity_at']
+            })
+        return result
+
+    def get_user_album_list(self, user_id):
+        """
+        {'version': albums_version, 'albums': get_user_albums()} (유저가 없으면 None)
+        버전은 매번 DB에서 읽고(ETag용), 목록만 버전별로 캐시한다
+        """
+        # 버전을 목록보다 먼저 읽어, 조회 중 바뀐 경우 다음 요청의 ETag가 달라지도록 함
+        version = self.user_service.get_albums_version(user_id)
+        if version is None:
+            return None
+        albums = read_through(user_albums_cache, f'{user_id}:{version}', lambda: self.get_user_albums(user_id))
+        return {'version': version, 'albums': albums}
+
     def get_user_albums(self, user_id):
         """유저가 소유하거나 멤버로 속한 앨범 조회"""
         user_id = ObjectId(user_id)
@@ -91,9 +408,9 @@ class Album:
         })
 
         return [{
-            'album_id': str(album['_id']),
+            'album_id': album['_id'],
             'title': album['title'],
             'description': album.get('description', ''),
-            'created_at': album['created_at'].isoformat() + 'Z',
+            'created_at': album['created_at'],
             'is_owner': str(album['owner_id']) == str(user_id)
         } for album in albums]
\ No newline at end of file
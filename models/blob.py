@@ -0,0 +1,133 @@
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from models.db import MongoModel
+from utils import storage, thumbnails
+import os
+import time
+
+# 마지막 참조 해제 후 파일 삭제 중(state=deleting)인 blob을 다시 등록하려 할 때의 대기 간격/최대 시간.
+# 삭제 중 프로세스가 죽어 이 시간이 지나도 남아 있으면 새 업로드가 blob을 넘겨받는다
+BLOB_RETRY_INTERVAL = 0.05
+BLOB_DELETE_TIMEOUT = int(os.getenv('BLOB_DELETE_TIMEOUT', 30))
+
+
+class Blob(MongoModel):
+    """
+    내용 주소 기반(sha256) 업로드 파일의 참조 카운트.
+    같은 내용의 사진은 디스크에 한 번만 저장하고, 마지막 참조가 사라질 때 파일을 지운다.
+    """
+
+    @property
+    def collection(self):
+        return self.db['blobs']
+
+    def acquire(self, digest, filename, size):
+        """
+        참조 카운트 +1.
+        같은 내용의 파일을 삭제하는 중이면 삭제가 끝날 때까지 기다렸다가 새로 등록한다.
+        반환: (실제 저장 파일명, 새로 등록된 내용인지 여부)
+        """
+        while True:
+            try:
+                previous = self.collection.find_one_and_update(
+                    {'_id': digest, 'state': {'$ne': 'deleting'}},
+                    {
+                        '$inc': {'refcount': 1},
+                        '$setOnInsert': {
+                            'filename': filename,
+                            'size': size,
+                            'created_at': datetime.now(timezone.utc)
+                        }
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                # state=deleting 문서가 있어 upsert가 _id 중복으로 실패
+                if self._take_over(digest, filename, size):
+                    return filename, True
+                time.sleep(BLOB_RETRY_INTERVAL)
+                continue
+            if previous is None:
+                return filename, True
+            return previous['filename'], False
+
+    def _take_over(self, digest, filename, size):
+        """BLOB_DELETE_TIMEOUT이 지나도록 삭제가 끝나지 않은 blob을 새 참조로 넘겨받음"""
+        now = datetime.now(timezone.utc)
+        return self.collection.find_one_and_update(
+            {'_id': digest, 'state': 'deleting', 'deleting_at': {'$lt': now - timedelta(seconds=BLOB_DELETE_TIMEOUT)}},
+            {
+                '$set': {'refcount': 1, 'filename': filename, 'size': size, 'created_at': now},
+                '$unset': {'state': '', 'deleting_at': '', 'released': ''}
+            }
+        ) is not None
+
+    def store(self, stream, ext):
+        """
+        업로드 스트림을 내용 해시(sha256) 이름으로 한 번만 저장.
+        이미 저장된 내용이면 디스크에 쓰지 않고 참조 카운트만 올린다.
+        반환: (저장 파일명, content_hash)
+        """
+        store = storage.get_storage()
+        digest, size = storage.hash_stream(stream)
+        filename, is_new = self.acquire(digest, f'{digest}{ext}', size)
+        if is_new or not store.exists(filename):
+            try:
+                store.save_stream(stream, filename)
+            except Exception:
+                self.release_content(digest)
+                raise
+        return filename, digest
+
+    def release_photo(self, photo_doc):
+        """사진 문서가 참조하던 파일 해제. 마지막 참조일 때만 실제 파일(및 썸네일) 삭제"""
+        digest = photo_doc.get('content_hash')
+        if digest:
+            self.release_content(digest, photo_doc.get('_id'))
+        else:
+            # 내용 해시 도입 이전에 업로드된 사진
+            storage.get_storage().remove(photo_doc['filename'])
+
+    def release_content(self, digest, photo_id=None):
+        """참조 카운트 -1, 마지막 참조였다면 파일/썸네일 삭제 후 blob 문서 삭제"""
+        filename = self.release(digest, photo_id)
+        if filename:
+            storage.get_storage().remove(filename)
+            thumbnails.remove_variants(digest)
+            # 삭제 중 넘겨받은(_take_over) 경우에는 state가 없어 지우지 않음
+            self.collection.delete_one({'_id': digest, 'state': 'deleting'})
+
+    def release(self, digest, photo_id=None):
+        """
+        참조 카운트 -1.
+        마지막 참조였다면 blob을 삭제 중(state=deleting)으로 표시하고 삭제할 파일명을 반환, 아니면 None.
+        삭제 중인 blob은 acquire가 참조를 늘리지 않으므로, 파일을 지우는 동안 새 업로드가 같은 파일을 쓰지 않는다.
+
+        photo_id를 주면 blob의 released 목록으로 사진당 한 번만 줄인다 (작업 재시도 시 중복 해제 방지).
+        이미 해제한 사진이고 파일 삭제가 중단된 상태라면 삭제할 파일명을 다시 반환한다.
+        """
+        query = {'_id': digest, 'state': {'$ne': 'deleting'}}
+        update = {'$inc': {'refcount': -1}}
+        if photo_id is not None:
+            query['released'] = {'$ne': photo_id}
+            update['$addToSet'] = {'released': photo_id}
+        blob = self.collection.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+        if blob is None:
+            if photo_id is None:
+                return None
+            # deleting_at을 갱신해 그 사이 _take_over되지 않도록 함
+            blob = self.collection.find_one_and_update(
+                {'_id': digest, 'state': 'deleting', 'released': photo_id},
+                {'$set': {'deleting_at': datetime.now(timezone.utc)}}
+            )
+            return blob['filename'] if blob else None
+        if blob['refcount'] > 0:
+            return None
+        # 그 사이 다른 업로드가 참조를 늘렸다면 삭제하지 않음
+        blob = self.collection.find_one_and_update(
+            {'_id': digest, 'refcount': {'$lte': 0}, 'state': {'$ne': 'deleting'}},
+            {'$set': {'state': 'deleting', 'deleting_at': datetime.now(timezone.utc)}}
+        )
+        return blob['filename'] if blob else None
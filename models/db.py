@@ -0,0 +1,76 @@
+from pymongo import MongoClient
+from utils import metrics
+import os
+import threading
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def client_options():
+    """환경 변수로 커넥션 풀/타임아웃/압축 설정 (값이 없으면 pymongo 기본값)"""
+    options = {
+        'maxPoolSize': _env_int('MONGO_MAX_POOL_SIZE'),
+        'minPoolSize': _env_int('MONGO_MIN_POOL_SIZE'),
+        'maxIdleTimeMS': _env_int('MONGO_MAX_IDLE_TIME_MS'),
+        'waitQueueTimeoutMS': _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        'connectTimeoutMS': _env_int('MONGO_CONNECT_TIMEOUT_MS'),
+        'socketTimeoutMS': _env_int('MONGO_SOCKET_TIMEOUT_MS'),
+        'serverSelectionTimeoutMS': _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+        'compressors': os.getenv('MONGO_COMPRESSORS'),  # 예: "zstd,snappy,zlib"
+    }
+    options = {key: value for key, value in options.items() if value is not None}
+    listeners = metrics.event_listeners()  # 명령 수/소요 시간 계측
+    if listeners:
+        options['event_listeners'] = listeners
+    return options
+
+
+def get_client():
+    """
+    프로세스당 하나의 MongoClient를 지연 생성해 반환.
+    fork 이전에 만들어진 클라이언트는 자식 프로세스에서 재사용하지 않는다.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _lock:
+        if _client is None or _client_pid != pid:
+            mongo_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+            _client = MongoClient(mongo_uri, **client_options())
+            _client_pid = pid
+    return _client
+
+
+def get_db():
+    return get_client()[os.getenv('MONGODB_DB', 'albumate')]
+
+
+def _reset_after_fork():
+    # 부모의 소켓을 닫지 않도록 close() 없이 참조만 버린다
+    global _client, _client_pid, _lock
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class MongoModel:
+    """db를 주입받거나, 없으면 프로세스 공용 클라이언트를 사용하는 모델 베이스"""
+
+    def __init__(self, db=None):
+        self._db = db
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else get_db()
@@ -0,0 +1,169 @@
+"""
+컬렉션 인덱스 선언 및 생성/점검 도구
+
+    python -m models.indexes            # 선언된 인덱스 생성 (이미 있으면 건너뜀)
+    python -m models.indexes --report   # 쿼리 패턴별 explain() 실행 후 COLLSCAN 표시
+"""
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from bson import ObjectId
+from models.db import get_db
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    'users': [
+        IndexModel([('username', ASCENDING)], name='username_unique', unique=True),
+        IndexModel([('nickname', ASCENDING)], name='nickname_unique', unique=True),
+    ],
+    'albums': [
+        IndexModel([('owner_id', ASCENDING)], name='owner_id'),
+    ],
+    'album_members': [
+        IndexModel([('album_id', ASCENDING), ('user_id', ASCENDING)], name='album_user_unique', unique=True),
+        IndexModel([('user_id', ASCENDING), ('album_id', ASCENDING)], name='user_album'),
+        IndexModel([('album_id', ASCENDING), ('joined_at', ASCENDING), ('_id', ASCENDING)], name='album_joined'),
+    ],
+    'album_invitations': [
+        IndexModel([('to_user_id', ASCENDING), ('status', ASCENDING)], name='to_user_status'),
+        IndexModel([('invite_token', ASCENDING), ('to_user_id', ASCENDING)], name='invite_token_to_user'),
+        IndexModel([('album_id', ASCENDING), ('to_user_id', ASCENDING)], name='album_to_user_unique', unique=True),
+    ],
+    'photos': [
+        IndexModel([('album_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='album_created'),
+    ],
+    'jobs': [
+        IndexModel([('status', ASCENDING), ('run_after', ASCENDING), ('created_at', ASCENDING)], name='status_run_after'),
+        IndexModel([('status', ASCENDING), ('lease_until', ASCENDING)], name='status_lease'),
+        IndexModel([('dedupe_key', ASCENDING)], name='dedupe_key_unique', unique=True, sparse=True),
+    ],
+    'revoked_tokens': [
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+        IndexModel([('revoked_at', ASCENDING)], name='revoked_at'),
+    ],
+    'rate_limits': [
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ],
+}
+
+# 같은 key로 이름/옵션을 바꾼 인덱스 {collection: {새 이름: 이전 이름}}
+# 이전 인덱스가 남아 있으면 create_indexes가 IndexOptionsConflict로 실패하므로 먼저 삭제하고 새로 만든다
+REPLACED_INDEXES = {
+    'album_invitations': {'album_to_user_unique': 'album_to_user'},
+}
+
+_sample_id = ObjectId()
+
+# models/, routes/ 에서 실제로 사용하는 조회 조건 (collection, filter, sort)
+QUERY_SHAPES = [
+    ('users', {'_id': _sample_id}, None),
+    ('users', {'username': 'sample@example.com'}, None),
+    ('users', {'nickname': 'sample'}, None),
+    ('users', {'username': {'$in': ['sample@example.com']}}, None),
+    ('users', {'_id': {'$in': [_sample_id]}}, None),
+    ('albums', {'_id': _sample_id}, None),
+    ('albums', {'$or': [{'owner_id': _sample_id}, {'_id': {'$in': [_sample_id]}}]}, None),
+    ('album_members', {'user_id': _sample_id}, None),
+    ('album_members', {'album_id': _sample_id}, [('joined_at', ASCENDING), ('_id', ASCENDING)]),
+    ('album_members', {'album_id': _sample_id, 'user_id': _sample_id}, None),
+    ('album_members', {'album_id': _sample_id, 'user_id': {'$ne': _sample_id}}, None),
+    ('album_invitations', {'to_user_id': _sample_id, 'status': 'pending'}, None),
+    ('album_invitations', {'invite_token': 'sample', 'to_user_id': _sample_id, 'status': 'pending'}, None),
+    ('album_invitations', {'album_id': _sample_id, 'to_user_id': _sample_id}, None),
+    ('album_invitations', {'album_id': _sample_id}, None),
+    ('photos', {'_id': _sample_id}, None),
+    ('photos', {'album_id': str(_sample_id)}, [('created_at', DESCENDING), ('_id', DESCENDING)]),
+    ('jobs', {'status': 'pending', 'run_after': {'$lte': _sample_id.generation_time}}, [('created_at', ASCENDING)]),
+    ('jobs', {'status': 'running', 'lease_until': {'$lt': _sample_id.generation_time}}, None),
+    ('photos', {'album_id': str(_sample_id)}, None),
+    ('revoked_tokens', {'_id': 'sample'}, None),
+    ('revoked_tokens', {'revoked_at': {'$gte': _sample_id.generation_time}}, None),
+    ('rate_limits', {'_id': 'sample'}, None),
+]
+
+
+def ensure_indexes(db=None):
+    """선언된 인덱스를 생성. 같은 정의의 인덱스가 있으면 MongoDB가 그대로 둔다."""
+    db = db if db is not None else get_db()
+    failed = []
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        replaced = REPLACED_INDEXES.get(collection_name, {})
+        existing = collection.index_information() if replaced else {}
+        for index in indexes:
+            name = index.document['name']
+            old_name = replaced.get(name)
+            if old_name in existing:
+                try:
+                    collection.drop_index(old_name)
+                    logger.info('이전 인덱스 삭제 %s.%s (-> %s)', collection_name, old_name, name)
+                except OperationFailure as e:
+                    # 다른 서버/프로세스가 먼저 삭제한 경우 (IndexNotFound)
+                    logger.info('이전 인덱스 삭제 건너뜀 %s.%s: %s', collection_name, old_name, e)
+            try:
+                collection.create_indexes([index])
+            except OperationFailure as e:
+                # 기존 데이터 중복 등으로 unique 인덱스 생성 실패 시 나머지는 계속 진행
+                logger.error('인덱스 생성 실패 %s.%s: %s', collection_name, name, e)
+                failed.append((collection_name, name, str(e)))
+                if old_name in existing:
+                    # 조회가 COLLSCAN이 되지 않도록 이전 인덱스 복구 (중복 데이터 정리 후 다시 실행)
+                    collection.create_index(existing[old_name]['key'], name=old_name)
+    return failed
+
+
+def _plan_stages(plan):
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def coverage_report(db=None):
+    """쿼리 패턴마다 explain()의 winning plan을 확인해 COLLSCAN 여부를 반환"""
+    db = db if db is not None else get_db()
+    report = []
+    for collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()['queryPlanner']['winningPlan']
+        stages = [stage for stage in _plan_stages(plan) if stage]
+        report.append({
+            'collection': collection_name,
+            'query': query,
+            'sort': sort,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+        })
+    return report
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='MongoDB 인덱스 생성/점검')
+    parser.add_argument('--report', action='store_true', help='쿼리 패턴별 COLLSCAN 점검')
+    args = parser.parse_args()
+
+    if args.report:
+        report = coverage_report()
+        for row in report:
+            flag = 'COLLSCAN' if row['collscan'] else 'ok'
+            print(f"[{flag:8}] {row['collection']:18} {row['query']} sort={row['sort']} -> {' > '.join(row['stages'])}")
+        return 1 if any(row['collscan'] for row in report) else 0
+
+    failed = ensure_indexes()
+    for collection_name, name, error in failed:
+        print(f'[failed] {collection_name}.{name}: {error}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from models.db import MongoModel
+import os
+
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 60))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+
+
+class LeaseLost(Exception):
+    """lease가 만료되어 다른 워커가 작업을 가져감 (이 워커는 작업을 중단해야 함)"""
+
+
+class Job(MongoModel):
+    """
+    Mongo 기반 작업 큐 (jobs 컬렉션).
+    워커는 lease(임대 만료 시각)를 잡고 작업을 수행하며, 워커가 죽어 lease가 만료되면
+    다른 워커가 같은 작업을 다시 가져가 이어서 처리한다. 따라서 작업 핸들러는 멱등이어야 한다.
+    작업 문서 변경은 모두 claim한 worker_id 조건으로 하므로, lease를 잃은 워커의 변경은 반영되지 않는다.
+    """
+
+    @property
+    def collection(self):
+        return self.db['jobs']
+
+    def enqueue(self, job_type, payload, dedupe_key=None):
+        """작업 등록 후 job_id 반환. dedupe_key가 같은 미완료 작업이 있으면 그 작업의 id를 반환"""
+        now = datetime.now(timezone.utc)
+        doc = {
+            'type': job_type,
+            'payload': payload,
+            'status': 'pending',
+            'attempts': 0,
+            'progress': {},
+            'run_after': now,
+            'lease_until': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        if dedupe_key:
+            doc['dedupe_key'] = dedupe_key
+        try:
+            return str(self.collection.insert_one(doc).inserted_id)
+        except DuplicateKeyError:
+            existing = self.collection.find_one({'dedupe_key': dedupe_key}, {'_id': 1})
+            return str(existing['_id'])
+
+    def claim(self, worker_id, lease_seconds=JOB_LEASE_SECONDS):
+        """실행할 작업 하나를 lease와 함께 가져옴 (대기 중이거나 lease가 만료된 실행 중 작업)"""
+        now = datetime.now(timezone.utc)
+        return self.collection.find_one_and_update(
+            {'$or': [
+                {'status': 'pending', 'run_after': {'$lte': now}},
+                {'status': 'running', 'lease_until': {'$lt': now}},
+            ]},
+            {
+                '$set': {
+                    'status': 'running',
+                    'worker_id': worker_id,
+                    'lease_until': now + timedelta(seconds=lease_seconds),
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _owned(job):
+        return {'_id': job['_id'], 'status': 'running', 'worker_id': job['worker_id']}
+
+    def heartbeat(self, job, update=None, lease_seconds=JOB_LEASE_SECONDS):
+        """
+        lease 연장 + 진행 상황 등 추가 변경 ($set/$inc/$pull 등 update 문서).
+        다른 워커가 작업을 가져갔으면 LeaseLost
+        """
+        now = datetime.now(timezone.utc)
+        update = dict(update or {})
+        update.setdefault('$set', {})
+        update['$set'] = {**update['$set'], 'lease_until': now + timedelta(seconds=lease_seconds), 'updated_at': now}
+        if self.collection.update_one(self._owned(job), update).matched_count == 0:
+            raise LeaseLost(job['_id'])
+
+    def complete(self, job):
+        now = datetime.now(timezone.utc)
+        result = self.collection.update_one(
+            self._owned(job),
+            {
+                '$set': {'status': 'done', 'lease_until': None, 'finished_at': now, 'updated_at': now},
+                '$unset': {'dedupe_key': ''}
+            }
+        )
+        if result.matched_count == 0:
+            raise LeaseLost(job['_id'])
+
+    def fail(self, job, error):
+        """재시도 횟수가 남았으면 지수 백오프 후 다시 대기, 아니면 failed"""
+        now = datetime.now(timezone.utc)
+        attempts = job['attempts']
+        if attempts < JOB_MAX_ATTEMPTS:
+            update = {'$set': {
+                'status': 'pending',
+                'lease_until': None,
+                'run_after': now + timedelta(seconds=2 ** attempts),
+                'last_error': error,
+                'updated_at': now
+            }}
+        else:
+            update = {
+                '$set': {'status': 'failed', 'lease_until': None, 'last_error': error, 'updated_at': now},
+                '$unset': {'dedupe_key': ''}
+            }
+        self.collection.update_one(self._owned(job), update)
+
+    def find_by_id(self, job_id):
+        try:
+            oid = ObjectId(job_id)
+        except Exception:
+            return None
+        return self.collection.find_one({'_id': oid}, {'pending_release': 0})
@@ -1,27 +1,73 @@
-from pymongo import MongoClient
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from models.db import MongoModel
+import base64
 import datetime
-import os
 
-MONGO_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URI)
-db = client['albumate']
+# 사진 목록 응답에 필요한 필드만 조회
+LIST_PROJECTION = {
+    'album_id': 1,
+    'user_id': 1,
+    'filename': 1,
+    'original_filename': 1,
+    'created_at': 1,
+    'variants': 1,
+}
 
-class Photo:
-    def __init__(self):
-        self.collection = db['photos']
 
-    def create(self, album_id, user_id, filename, original_filename):
-        doc = {
+def encode_cursor(doc):
+    """(created_at, _id) 위치를 불투명한 문자열로 인코딩"""
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """encode_cursor의 역변환. 형식이 잘못되면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, oid = raw.split('|')
+        return datetime.datetime.fromisoformat(created_at), ObjectId(oid)
+    except Exception as e:
+        raise ValueError('invalid cursor') from e
+
+
+class Photo(MongoModel):
+    @property
+    def collection(self):
+        return self.db['photos']
+
+    @staticmethod
+    def new_document(album_id, user_id, filename, original_filename, content_hash=None):
+        """저장될 사진 문서 생성. created_at은 MongoDB 정밀도(ms)에 맞춰 잘라 재조회 없이 응답에 사용"""
+        now = datetime.datetime.utcnow()
+        return {
             'album_id': album_id,
             'user_id': user_id,
             'filename': filename,
             'original_filename': original_filename,
-            'created_at': datetime.datetime.utcnow()
+            'content_hash': content_hash,
+            'created_at': now.replace(microsecond=now.microsecond // 1000 * 1000)
         }
+
+    def create(self, album_id, user_id, filename, original_filename, content_hash=None):
+        doc = self.new_document(album_id, user_id, filename, original_filename, content_hash)
         result = self.collection.insert_one(doc)
         return str(result.inserted_id)
 
+    def insert_documents(self, docs):
+        """
+        여러 사진 문서를 insert_many 한 번으로 저장 (각 문서에 _id가 채워짐).
+        반환: 저장에 실패한 문서의 인덱스 -> 오류 메시지
+        """
+        if not docs:
+            return {}
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            return {error['index']: error.get('errmsg', 'insert failed') for error in e.details.get('writeErrors', [])}
+        return {}
+
     def find_by_id(self, photo_id):
         try:
             oid = ObjectId(photo_id)
@@ -32,6 +78,34 @@ class Photo:
     def find_by_album(self, album_id):
         return list(self.collection.find({'album_id': album_id}))
 
+    def find_page_by_album(self, album_id, limit=None, cursor=None, newest_first=True):
+        """
+        (created_at, _id) 기준 keyset 페이지네이션. limit이 None이면 cursor 이후 전체.
+        반환: (사진 문서 목록, 다음 페이지 cursor 또는 None)
+        """
+        direction = DESCENDING if newest_first else ASCENDING
+        query = {'album_id': album_id}
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            op = '$lt' if newest_first else '$gt'
+            query['$or'] = [
+                {'created_at': {op: created_at}},
+                {'created_at': created_at, '_id': {op: last_id}},
+            ]
+
+        docs = self.collection.find(query, LIST_PROJECTION).sort([('created_at', direction), ('_id', direction)])
+        if limit is None:
+            return list(docs), None
+        docs = list(docs.limit(limit + 1))
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1])
+        return docs, next_cursor
+
+    def set_variants(self, photo_id, variants):
+        self.collection.update_one({'_id': ObjectId(photo_id)}, {'$set': {'variants': variants}})
+
     def delete(self, photo_id):
         try:
             oid = ObjectId(photo_id)
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from models.db import MongoModel
+import time
+
+
+class SharedRateLimiter(MongoModel):
+    """
+    utils.throttle.RateLimiter와 같은 인터페이스의 고정 윈도우 제한을 MongoDB에 보관.
+    모든 워커/서버가 같은 카운터를 쓰고 재시작해도 유지되며, 지난 윈도우의 문서는 TTL 인덱스(rate_limits)로 지워진다.
+    계정별 로그인 실패처럼 워커 수만큼 한도가 늘어나면 안 되는 제한에 사용 (요청마다 _id 조회 1회)
+    """
+
+    def __init__(self, limit, window, db=None):
+        super().__init__(db)
+        self.limit = limit
+        self.window = window
+
+    @property
+    def collection(self):
+        return self.db['rate_limits']
+
+    def _window(self, key, now):
+        started_at = int(now // self.window) * self.window
+        return f'{key}:{started_at}', started_at
+
+    def status(self, key):
+        """(retry_after, 현재 윈도우의 횟수). 횟수가 0이면 reset을 생략할 수 있다"""
+        now = time.time()
+        window_id, started_at = self._window(key, now)
+        doc = self.collection.find_one({'_id': window_id}, {'count': 1})
+        count = doc['count'] if doc else 0
+        if count < self.limit:
+            return 0, count
+        return max(1, int(started_at + self.window - now)), count
+
+    def retry_after(self, key):
+        """제한에 걸렸으면 다시 시도할 수 있을 때까지 남은 초, 아니면 0"""
+        return self.status(key)[0]
+
+    def hit(self, key):
+        window_id, started_at = self._window(key, time.time())
+        self.collection.update_one(
+            {'_id': window_id},
+            {
+                '$inc': {'count': 1},
+                '$setOnInsert': {'expires_at': datetime.fromtimestamp(started_at + self.window, timezone.utc)}
+            },
+            upsert=True
+        )
+
+    def reset(self, key):
+        window_id, _ = self._window(key, time.time())
+        self.collection.delete_one({'_id': window_id})
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from models.db import MongoModel
+from utils.bloom import BloomFilter
+import hashlib
+import threading
+import time
+import os
+
+REVOCATION_FILTER_CAPACITY = int(os.getenv('REVOCATION_FILTER_CAPACITY', 100000))
+REVOCATION_SYNC_INTERVAL = float(os.getenv('REVOCATION_SYNC_INTERVAL', 5))
+REVOCATION_REBUILD_INTERVAL = float(os.getenv('REVOCATION_REBUILD_INTERVAL', 3600))
+# 다른 워커의 삽입과 시계 오차를 고려해 증분 동기화 구간을 약간 겹치게 조회
+SYNC_OVERLAP = timedelta(seconds=2)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class RevokedToken(MongoModel):
+    """
+    로그아웃된 토큰 저장소.
+    - Mongo TTL 컬렉션(revoked_tokens, models/indexes.py 참고)에 토큰 해시를 exp까지 보관 → 모든 워커가 공유
+    - 워커마다 Bloom filter를 두어 "폐기되지 않음"인 대부분의 요청은 DB 조회 없이 통과
+    """
+
+    def __init__(self, db=None):
+        super().__init__(db)
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_at = None
+        self._next_sync = 0
+        self._next_rebuild = 0
+
+    @property
+    def collection(self):
+        return self.db['revoked_tokens']
+
+    def revoke(self, token, expires_at):
+        digest = token_digest(token)
+        now = datetime.now(timezone.utc)
+        self.collection.update_one(
+            {'_id': digest},
+            {'$setOnInsert': {'expires_at': expires_at, 'revoked_at': now}},
+            upsert=True
+        )
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(digest)
+
+    def is_revoked(self, token):
+        digest = token_digest(token)
+        self._refresh()
+        if digest not in self._filter:
+            return False
+        # Bloom filter 양성은 거짓 양성일 수 있으므로 DB로 확정
+        return self.collection.find_one({'_id': digest}, {'_id': 1}) is not None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._filter is not None and now < self._next_sync:
+            return
+        with self._lock:
+            if self._filter is not None and now < self._next_sync:
+                return
+            if self._filter is None or self._filter.saturated or now >= self._next_rebuild:
+                self._rebuild()
+                self._next_rebuild = now + REVOCATION_REBUILD_INTERVAL
+            else:
+                self._sync()
+            self._next_sync = now + REVOCATION_SYNC_INTERVAL
+
+    def _rebuild(self):
+        """
+        만료되지 않은 항목만으로 필터를 다시 만들어 메모리를 일정하게 유지.
+        폐기된 토큰이 설정 용량보다 많으면 실제 개수의 2배로 만들어 곧바로 다시 포화되지 않게 한다.
+        """
+        started_at = datetime.now(timezone.utc)
+        query = {'expires_at': {'$gt': started_at}}
+        live = self.collection.count_documents(query)
+        bloom = BloomFilter(capacity=max(REVOCATION_FILTER_CAPACITY, live * 2))
+        for doc in self.collection.find(query, {'_id': 1}):
+            bloom.add(doc['_id'])
+        self._filter = bloom
+        self._synced_at = started_at
+
+    def _sync(self):
+        """마지막 동기화 이후 폐기된 토큰만 증분으로 반영"""
+        started_at = datetime.now(timezone.utc)
+        cursor = self.collection.find(
+            {'revoked_at': {'$gte': self._synced_at - SYNC_OVERLAP}},
+            {'_id': 1}
+        )
+        for doc in cursor:
+            self._filter.add(doc['_id'])
+        self._synced_at = started_at
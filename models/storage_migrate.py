@@ -0,0 +1,158 @@
+"""
+업로드 파일 저장 구조 마이그레이션 (서비스 운영 중 실행 가능)
+
+    python -m models.storage_migrate [--batch-size 500] [--dry-run]
+
+1) 평면 배치(uploads/<파일명>, uploads/thumbs/<파일명>)의 내용 해시 파일을 현재 저장소
+   (STORAGE_BACKEND, 기본: 2단계 디렉터리 배치)로 옮긴다.
+2) 내용 해시 도입 이전에 원본 파일명으로 저장된 사진 문서를 배치 단위로 내용 해시 방식으로 바꾼다.
+   파일을 해시해 저장소에 저장하고 blobs 참조 카운트를 올린 뒤 사진 문서의 filename/content_hash를 갱신한다.
+   배치마다 더 이상 참조하는 문서가 없는 이전 파일을 삭제하고, 사진 URL이 바뀐 앨범의 버전을 올린다(ETag 갱신).
+   변환 중에는 이전 파일명 조회용 임시 인덱스(LEGACY_FILENAME_INDEX)를 만들고 끝나면 삭제한다.
+
+저장소는 옮기는 중에도 새 경로와 이전 경로를 모두 확인하므로 읽기 요청은 계속 처리된다.
+"""
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from models.album import Album
+from models.blob import Blob
+from models.db import get_db
+from utils import storage
+from utils.thumbnails import THUMBNAIL_DIR
+import argparse
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_NAME = re.compile(r'^[0-9a-f]{64}')
+
+# 배치마다 "아직 이 이전 파일을 쓰는 문서가 있는지"를 컬렉션 전체 스캔 없이 확인하기 위한 임시 인덱스
+LEGACY_FILENAME_INDEX = IndexModel(
+    [('content_hash', ASCENDING), ('filename', ASCENDING)], name='storage_migrate_legacy_filename')
+
+
+def _flat_files(folder):
+    if not os.path.isdir(folder):
+        return
+    for entry in os.scandir(folder):
+        if entry.is_file() and not entry.name.startswith('.'):
+            yield entry
+
+
+def migrate_flat_files(store, legacy_root, dry_run=False):
+    """평면 배치의 내용 해시 파일(원본, 썸네일)을 현재 저장소로 이동"""
+    moved = 0
+    for directory in ('', THUMBNAIL_DIR):
+        for entry in _flat_files(os.path.join(legacy_root, directory)):
+            if not _DIGEST_NAME.match(entry.name):
+                continue  # 이전 업로드 파일은 migrate_legacy_photos에서 처리
+            filename = os.path.join(directory, entry.name) if directory else entry.name
+            if store.name == 'local' and store.local_path(filename) != entry.path:
+                continue  # 이미 새 경로에 있음
+            if not dry_run:
+                store.save_file(entry.path, filename)
+            moved += 1
+    return moved
+
+
+def migrate_legacy_photos(store, legacy_root, batch_size=500, dry_run=False):
+    """content_hash가 없는 사진 문서를 배치 단위로 내용 해시 방식으로 변환"""
+    photos = get_db()['photos']
+    blob_service = Blob()
+    album_service = Album()
+    converted = 0
+    missing = 0
+    last_id = None
+    if not dry_run:
+        photos.create_indexes([LEGACY_FILENAME_INDEX])
+
+    while True:
+        query = {'content_hash': None}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(photos.find(query, {'filename': 1, 'album_id': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        legacy_files = set()
+        album_ids = set()
+
+        for doc in batch:
+            legacy_path = os.path.join(legacy_root, doc['filename'])
+            if not os.path.isfile(legacy_path):
+                missing += 1
+                continue
+            converted += 1
+            if dry_run:
+                continue
+            with open(legacy_path, 'rb') as f:
+                digest, size = storage.hash_stream(f)
+                ext = os.path.splitext(doc['filename'])[1].lower()
+                filename, is_new = blob_service.acquire(digest, f'{digest}{ext}', size)
+                if is_new or not store.exists(filename):
+                    try:
+                        store.save_stream(f, filename)
+                    except Exception:
+                        blob_service.release_content(digest)
+                        raise
+            # 다른 프로세스가 먼저 변환했다면 참조 카운트를 되돌림
+            result = photos.update_one(
+                {'_id': doc['_id'], 'content_hash': None},
+                {'$set': {'filename': filename, 'content_hash': digest}}
+            )
+            if result.modified_count == 0:
+                blob_service.release_content(digest)
+                continue
+            legacy_files.add(doc['filename'])
+            album_ids.add(doc.get('album_id'))
+
+        # 중단되어도 이미 변환한 배치의 이전 파일이 남지 않도록 배치마다 정리
+        _remove_unreferenced(photos, legacy_root, legacy_files)
+        for album_id in album_ids:
+            album_service.record_photo_updated(album_id)
+
+    if not dry_run:
+        try:
+            photos.drop_index(LEGACY_FILENAME_INDEX.document['name'])
+        except OperationFailure as e:
+            logger.warning('임시 인덱스 삭제 실패: %s', e)
+
+    return converted, missing
+
+
+def _remove_unreferenced(photos, legacy_root, legacy_files):
+    """아직 변환되지 않은 다른 문서가 쓰지 않는 이전 파일 삭제 (임시 인덱스로 배치당 조회 1회)"""
+    if not legacy_files:
+        return
+    still_used = set(photos.distinct(
+        'filename', {'content_hash': None, 'filename': {'$in': list(legacy_files)}}))
+    for legacy_filename in legacy_files - still_used:
+        try:
+            os.remove(os.path.join(legacy_root, legacy_filename))
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='업로드 파일 저장 구조 마이그레이션')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help='변경 없이 대상 개수만 출력')
+    args = parser.parse_args()
+
+    store = storage.get_storage()
+    legacy_root = storage.upload_folder()
+
+    moved = migrate_flat_files(store, legacy_root, dry_run=args.dry_run)
+    print(f'moved content-addressed files: {moved}')
+    converted, missing = migrate_legacy_photos(store, legacy_root, args.batch_size, dry_run=args.dry_run)
+    print(f'converted legacy photos: {converted} (file missing: {missing})')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
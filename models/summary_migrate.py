@@ -0,0 +1,28 @@
+"""
+앨범 요약 값 마이그레이션 (서비스 운영 중 실행 가능)
+
+    python -m models.summary_migrate [--batch-size 500]
+
+대시보드 요약 값(member_count, photo_count, cover) 도입 이전에 만들어진 앨범은
+업로드/가입 시 $inc가 0부터 시작해 값이 틀어지므로, 배포 직후 한 번 실행해 count로 다시 계산한다.
+실행하지 않아도 대시보드 조회 시 앨범별로 다시 계산한다.
+"""
+from models.album import Album
+import argparse
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='앨범 요약 값 다시 계산')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    rebuilt = Album().rebuild_summaries(args.batch_size)
+    print(f'rebuilt album summaries: {rebuilt}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,12 +1,86 @@
-from pymongo import MongoClient
-from werkzeug.security import generate_password_hash, check_password_hash
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from models.db import MongoModel
+from utils.bloom import BloomFilter
+from utils.cache import TTLCache, create_cache
+from utils.hashing import password_hasher
+import logging
+import os
+import threading
+import time
 
-client = MongoClient('mongodb://localhost:27017/')
-db = client['albumate']
+logger = logging.getLogger(__name__)
 
-class User:
-    def __init__(self):
-        self.collection = db['users']
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 50000))
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 300))
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 60))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 10000))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+AVAILABILITY_FILTER_CAPACITY = int(os.getenv('AVAILABILITY_FILTER_CAPACITY', 1000000))
+AVAILABILITY_SYNC_INTERVAL = float(os.getenv('AVAILABILITY_SYNC_INTERVAL', 5))
+# ObjectId 생성 시각은 서버마다 조금씩 다를 수 있어 증분 동기화 구간을 겹치게 조회
+AVAILABILITY_SYNC_OVERLAP = timedelta(seconds=10)
+INVITE_POLL_INTERVAL = float(os.getenv('INVITE_POLL_INTERVAL', 2))
+
+# 검증된 JWT user_id -> 유저 문서 캐시 (token_required가 요청마다 users를 조회하지 않도록)
+# 비밀번호 해시는 캐시하지 않는다 (IDENTITY_FIELDS만 조회)
+IDENTITY_FIELDS = {'username': 1, 'nickname': 1}
+identity_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL, name='identity')
+# 닉네임/이메일 표시용 프로필 캐시 (모든 엔드포인트가 공유)
+profile_cache = create_cache('profile', maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+# 유저별 앨범 목록 {'version': albums_version, 'albums': [...]} (bump_albums_version에서 무효화)
+user_albums_cache = create_cache('user_albums', maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+class DuplicateUserError(Exception):
+    """이미 사용 중인 username 또는 nickname (field 속성)"""
+
+    def __init__(self, field):
+        super().__init__(field)
+        self.field = field
+
+
+class User(MongoModel):
+    @property
+    def collection(self):
+        return self.db['users']
+
+    def get_profiles(self, user_ids):
+        """
+        user_id 목록의 {'nickname', 'username'} 프로필을 반환 (key: str(user_id)).
+        캐시에 없는 유저만 $in 쿼리 한 번으로 조회한다.
+        """
+        profiles = profile_cache.get_many(str(user_id) for user_id in user_ids)
+        missing = [ObjectId(user_id) for user_id in user_ids if str(user_id) not in profiles]
+
+        if missing:
+            for user in self.collection.find({'_id': {'$in': missing}}, {'nickname': 1, 'username': 1}):
+                profile = {'nickname': user.get('nickname', ''), 'username': user.get('username', '')}
+                profile_cache.set(str(user['_id']), profile)
+                profiles[str(user['_id'])] = profile
+        return profiles
+
+    def get_profile(self, user_id):
+        return self.get_profiles([user_id]).get(str(user_id))
+
+    def invalidate_profile(self, user_id):
+        profile_cache.delete(str(user_id))
+
+    def get_identity(self, user_id):
+        """인증된 유저 문서 (비밀번호 해시 제외). 캐시에 없으면 DB에서 읽어 저장"""
+        key = str(user_id)
+        user = identity_cache.get(key)
+        if user is None:
+            user = self.collection.find_one({'_id': ObjectId(user_id)}, IDENTITY_FIELDS)
+            if user:
+                identity_cache.set(key, user)
+        return user
+
+    def invalidate_identity(self, user_id):
+        """계정 정보(비밀번호/username/nickname) 변경 또는 삭제 시 호출"""
+        identity_cache.delete(str(user_id))
+        self.invalidate_profile(user_id)
 
     def find_by_username(self, username):
         return self.collection.find_one({'username': username})
@@ -15,21 +89,231 @@ class User:
         return self.collection.find_one({'nickname': nickname})
 
     def create_user(self, username, password, nickname):
-        if self.collection.find_one({'username': username}) or self.collection.find_one({'nickname': nickname}):
-            return None
-
-        hashed_password = generate_password_hash(password)
-        user_id = self.collection.insert_one({
-            'username': username,
-            'password': hashed_password,
-            'nickname': nickname
-        }).inserted_id
+        """
+        insert 한 번으로 가입 처리. 중복 여부는 username/nickname unique 인덱스로 판단하며,
+        중복이면 DuplicateUserError(field)를 발생시킨다.
+        """
+        hashed_password = password_hasher.hash(password)
+        try:
+            user_id = self.collection.insert_one({
+                'username': username,
+                'password': hashed_password,
+                'nickname': nickname
+            }).inserted_id
+        except DuplicateKeyError as e:
+            key_pattern = (e.details or {}).get('keyPattern')
+            if key_pattern:
+                field = 'nickname' if 'nickname' in key_pattern else 'username'
+            else:
+                # keyPattern이 없는 서버 버전은 오류 메시지의 인덱스 이름으로 판단 (값에 'nickname'이 들어갈 수 있어 이름 전체로 비교)
+                field = 'nickname' if 'index: nickname_unique' in str(e) else 'username'
+            raise DuplicateUserError(field) from e
         return str(user_id)
 
     def verify_user(self, username, password):
         user = self.find_by_username(username)
         if not user:
             return None
-        if not check_password_hash(user['password'], password):
+        if not password_hasher.verify(user['password'], password):
             return None
-        return user
\ No newline at end of file
+        if password_hasher.needs_rehash(user['password']):
+            # 로그인 성공 시 현재 설정(PASSWORD_HASH_METHOD)의 해시로 교체
+            user['password'] = password_hasher.hash(password)
+            self.collection.update_one({'_id': user['_id']}, {'$set': {'password': user['password']}})
+            self.invalidate_identity(user['_id'])
+        return user
+
+    def bump_invite_version(self, user_ids):
+        """초대 목록이 바뀐 유저의 invite_version +1 (초대 알림 스트림이 이 값만 확인)"""
+        user_ids = [ObjectId(user_id) for user_id in user_ids]
+        if user_ids:
+            self.collection.update_many({'_id': {'$in': user_ids}}, {'$inc': {'invite_version': 1}})
+
+    def bump_albums_version(self, user_ids):
+        """속한 앨범 목록(가입/탈퇴/생성/삭제, 앨범 정보 수정)이 바뀐 유저의 albums_version +1"""
+        user_ids = [ObjectId(user_id) for user_id in user_ids]
+        if user_ids:
+            # 앨범 목록 캐시는 버전별 key라 따로 지우지 않아도 다음 조회부터 새 버전을 읽는다
+            self.collection.update_many({'_id': {'$in': user_ids}}, {'$inc': {'albums_version': 1}})
+
+    def get_albums_version(self, user_id):
+        """앨범 목록 ETag용 버전 (유저가 없으면 None)"""
+        user = self.collection.find_one({'_id': ObjectId(user_id)}, {'albums_version': 1})
+        return user.get('albums_version', 0) if user else None
+
+    def get_invite_versions(self, user_ids):
+        """{str(user_id): invite_version} (_id 인덱스 조회 1회)"""
+        users = self.collection.find(
+            {'_id': {'$in': [ObjectId(user_id) for user_id in user_ids]}}, {'invite_version': 1})
+        return {str(user['_id']): user.get('invite_version', 0) for user in users}
+
+
+def normalize_username(username):
+    return (username or '').strip().lower()
+
+
+def normalize_nickname(nickname):
+    return (nickname or '').strip()
+
+
+class AvailabilityIndex:
+    """
+    워커별 username/nickname Bloom filter.
+    filter에 없으면 "확실히 사용 가능"으로 DB 조회 없이 응답하고, 있을 때만(거짓 양성 가능) DB로 확인한다.
+    새 가입자는 _id(ObjectId) 생성 시각 기준으로 주기적으로 증분 반영한다.
+    유저는 삭제되지 않으므로 전체 재구성은 처음과 filter가 포화됐을 때만 하며, 백그라운드 스레드에서 만드는 동안
+    요청은 이전 filter(처음에는 DB 조회)로 처리한다.
+    """
+
+    def __init__(self, user_service):
+        self.user_service = user_service
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_at = None
+        self._next_sync = 0
+        self._building = False
+        self._next_build = 0
+
+    def username_available(self, username):
+        if not self._might_exist('u:' + normalize_username(username)):
+            return True
+        return self.user_service.collection.find_one({'username': username}, {'_id': 1}) is None
+
+    def nickname_available(self, nickname):
+        if not self._might_exist('n:' + normalize_nickname(nickname)):
+            return True
+        return self.user_service.collection.find_one({'nickname': nickname}, {'_id': 1}) is None
+
+    def add(self, username, nickname):
+        """이 워커에서 가입한 유저는 다음 동기화를 기다리지 않고 바로 반영"""
+        with self._lock:
+            if self._filter is not None:
+                self._add(self._filter, username, nickname)
+
+    def _might_exist(self, key):
+        self._refresh()
+        bloom = self._filter
+        return bloom is None or key in bloom  # 아직 만드는 중이면 DB로 확인
+
+    @staticmethod
+    def _add(bloom, username, nickname):
+        bloom.add('u:' + normalize_username(username))
+        bloom.add('n:' + normalize_nickname(nickname))
+
+    def _refresh(self):
+        now = time.monotonic()
+        bloom = self._filter
+        if bloom is not None and not bloom.saturated and now < self._next_sync:
+            return
+        with self._lock:
+            if (self._filter is None or self._filter.saturated) and not self._building and now >= self._next_build:
+                self._building = True
+                threading.Thread(target=self._build_in_background, daemon=True).start()
+            if self._filter is None or now < self._next_sync:
+                return
+            # 동기화를 맡은 요청만 DB를 조회하고, 나머지 요청은 기다리지 않고 현재 filter를 사용
+            self._next_sync = now + AVAILABILITY_SYNC_INTERVAL
+            synced_at = self._synced_at
+        started_at = datetime.now(timezone.utc)
+        users = list(self.user_service.collection.find(
+            {'_id': {'$gte': ObjectId.from_datetime(synced_at - AVAILABILITY_SYNC_OVERLAP)}},
+            {'username': 1, 'nickname': 1}
+        ))
+        with self._lock:
+            for user in users:
+                self._add(self._filter, user.get('username'), user.get('nickname'))
+            if self._synced_at == synced_at:
+                self._synced_at = started_at
+
+    def _build_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('가입 가능 여부 filter 생성 실패')
+            with self._lock:
+                self._next_build = time.monotonic() + AVAILABILITY_SYNC_INTERVAL
+        finally:
+            with self._lock:
+                self._building = False
+
+    def rebuild(self):
+        """users 전체로 새 filter를 만들어 교체 (만드는 동안 요청은 이전 filter 사용)"""
+        started_at = datetime.now(timezone.utc)
+        # 유저 수(키는 유저당 2개)가 설정 용량보다 많으면 그 2배로 만들어 곧바로 다시 포화되지 않게 함
+        users = self.user_service.collection.estimated_document_count()
+        bloom = BloomFilter(capacity=max(AVAILABILITY_FILTER_CAPACITY, users * 4))
+        for user in self.user_service.collection.find({}, {'username': 1, 'nickname': 1}):
+            self._add(bloom, user.get('username'), user.get('nickname'))
+        with self._lock:
+            self._filter = bloom
+            # 만드는 동안 가입한 유저는 시작 시각 기준 증분 동기화로 바로 반영
+            self._synced_at = started_at
+            self._next_sync = 0
+
+
+class InviteVersionWatcher:
+    """
+    워커 내 초대 알림 스트림들이 공유하는 invite_version 조회.
+    연결 수와 관계없이 INVITE_POLL_INTERVAL마다 구독 중인 유저 전체를 $in 쿼리 1회로 확인하며,
+    별도 스레드 없이 기다리던 연결 중 하나가 조회하고 나머지는 결과를 기다린다.
+    """
+
+    def __init__(self, user_service, interval=INVITE_POLL_INTERVAL):
+        self.user_service = user_service
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._subscribers = {}  # user_id -> 연결 수
+        self._versions = {}
+        self._polling = False
+        self._next_poll = 0
+
+    def subscribe(self, user_id):
+        """구독 시작 후 현재 버전 반환"""
+        user_id = str(user_id)
+        version = self.user_service.get_invite_versions([user_id]).get(user_id, 0)
+        with self._cond:
+            self._subscribers[user_id] = self._subscribers.get(user_id, 0) + 1
+            self._versions.setdefault(user_id, version)
+        return version
+
+    def unsubscribe(self, user_id):
+        user_id = str(user_id)
+        with self._cond:
+            count = self._subscribers.get(user_id, 0) - 1
+            if count > 0:
+                self._subscribers[user_id] = count
+            else:
+                self._subscribers.pop(user_id, None)
+                self._versions.pop(user_id, None)
+
+    def wait(self, user_id, version, timeout):
+        """버전이 version과 달라지거나 timeout이 지나면 현재 버전 반환"""
+        user_id = str(user_id)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                current = self._versions.get(user_id, version)
+                now = time.monotonic()
+                if current != version or now >= deadline:
+                    return current
+                if self._polling or now < self._next_poll:
+                    wake_at = deadline if self._polling else min(deadline, self._next_poll)
+                    self._cond.wait(wake_at - now)
+                    continue
+                self._poll()
+
+    def _poll(self):
+        # self._cond를 잡은 상태에서 호출. DB 조회 중에는 잠금을 풀어 둔다
+        self._polling = True
+        user_ids = list(self._subscribers)
+        self._cond.release()
+        try:
+            versions = self.user_service.get_invite_versions(user_ids) if user_ids else {}
+        finally:
+            self._cond.acquire()
+            self._polling = False
+            self._next_poll = time.monotonic() + self.interval
+            self._cond.notify_all()
+        for user_id, version in versions.items():
+            if user_id in self._subscribers:
+                self._versions[user_id] = version
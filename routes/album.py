@@ -1,14 +1,32 @@
 import os
-from flask import request
+from flask import Response, request
 from flask_restx import Namespace, Resource, fields
 from bson import ObjectId
-from datetime import datetime
 from models.album import Album
+from models.job import Job
+from models.user import InviteVersionWatcher
 from .auth import token_required
-from utils.response import make_response
+from utils.response import etag_headers, make_response, make_stream_response, not_modified
+from utils.serializer import dumps
+from utils.static_files import upload_url
+import time
+
+try:
+    from gevent import monkey
+except ImportError:
+    monkey = None
 
 album_ns = Namespace('albums', description='앨범 관련 API')
 album_service = Album()
+job_service = Job()
+invite_watcher = InviteVersionWatcher(album_service.user_service)
+
+MEMBER_PAGE_SIZE = int(os.getenv('MEMBER_PAGE_SIZE', 200))
+MEMBER_PAGE_MAX_SIZE = int(os.getenv('MEMBER_PAGE_MAX_SIZE', 1000))
+INVITE_STREAM_HEARTBEAT = float(os.getenv('INVITE_STREAM_HEARTBEAT', 15))
+INVITE_STREAM_MAX_SECONDS = float(os.getenv('INVITE_STREAM_MAX_SECONDS', 300))
+# 연결을 유지할 수 없는 워커에서 EventSource가 다시 연결하기까지 기다릴 시간 (ms)
+INVITE_STREAM_FALLBACK_RETRY = int(os.getenv('INVITE_STREAM_FALLBACK_RETRY', 15000))
 
 create_album_model = album_ns.model('CreateAlbum', {
     'title': fields.String(required=True, description='앨범 이름'),
@@ -16,6 +34,11 @@ create_album_model = album_ns.model('CreateAlbum', {
     'invite_emails': fields.List(fields.String, required=False, description='초대할 이메일 목록')
 })
 
+update_album_model = album_ns.model('UpdateAlbum', {
+    'title': fields.String(required=False, description='앨범 이름'),
+    'description': fields.String(required=False, description='앨범 설명')
+})
+
 invite_model = album_ns.model('InviteUsers', {
     'invite_emails': fields.List(fields.String, required=True, description='초대할 사용자 이메일 목록')
 })
@@ -58,44 +81,98 @@ class AlbumInvite(Resource):
 
         return make_response(200, '초대 요청 완료', result)
 
+@album_ns.route('/dashboard')
+class AlbumDashboard(Resource):
+    @album_ns.doc(security='Bearer Auth')
+    @token_required
+    def get(self):
+        """
+        내가 속한 앨범 목록 + 멤버 수/사진 수/대표 사진/최근 활동 시각 (최근 활동 순)
+        - 헤더: Authorization: Bearer {access_token}
+        """
+        albums = album_service.get_dashboard(request.current_user_id)
+        for album in albums:
+            cover = album['cover']
+            if cover:
+                cover['url'] = upload_url(cover.pop('filename'))
+        return make_response(200, '앨범 대시보드 조회 성공', albums)
+
 @album_ns.route('/invitations')
 class AlbumInvitations(Resource):
     @album_ns.doc(security='Bearer Auth')
     @token_required
     def get(self):
-        user_id = ObjectId(request.current_user_id)
-        invites = album_service.invite_collection.aggregate([
-            {'$match': {'to_user_id': user_id, 'status': 'pending'}},
-            {'$lookup': {
-                'from': 'albums',
-                'localField': 'album_id',
-                'foreignField': '_id',
-                'as': 'album_info'
-            }},
-            {'$unwind': '$album_info'},
-            {'$lookup': {
-                'from': 'users',
-                'localField': 'from_user_id',
-                'foreignField': '_id',
-                'as': 'from_user'
-            }},
-            {'$unwind': '$from_user'},
-            {'$project': {
-                '_id': 0,
-                'album_id': {'$toString': '$album_id'},
-                'invite_token': 1,
-                'from_user': {
-                    'user_id': {'$toString': '$from_user._id'},
-                    'nickname': '$from_user.nickname'
-                },
-                'album': {
-                    'title': '$album_info.title',
-                    'description': '$album_info.description'
-                },
-                'created_at': 1
-            }}
-        ])
-        return make_response(200, '초대 목록 조회 완료', list(invites))
+        invites = album_service.get_pending_invitations(request.current_user_id)
+        return make_stream_response(200, '초대 목록 조회 완료', invites)
+
+def can_hold_stream(environ):
+    """연결을 오래 붙잡아도 다른 요청을 막지 않는 서버인지 (gevent monkey patch 또는 스레드 서버)"""
+    if monkey is not None and monkey.is_module_patched('socket'):
+        return True
+    return bool(environ.get('wsgi.multithread'))
+
+def invitation_event(user_id, version):
+    invites = list(album_service.get_pending_invitations(user_id))
+    return b'id: %d\nevent: invitations\ndata: %s\n\n' % (version, dumps(invites))
+
+def invitation_snapshot(user_id, last_version):
+    """
+    sync 워커용: 바뀐 경우에만 대기 목록을 한 번 보내고 바로 응답을 끝낸다.
+    EventSource가 retry 후 Last-Event-ID와 함께 다시 연결하므로 폴링처럼 동작한다.
+    """
+    user_id = str(user_id)
+    version = album_service.user_service.get_invite_versions([user_id]).get(user_id, 0)
+    body = b'retry: %d\n\n' % INVITE_STREAM_FALLBACK_RETRY
+    if version != last_version:
+        body += invitation_event(user_id, version)
+    return body
+
+def invitation_events(user_id, last_version):
+    """
+    초대 버전이 바뀔 때만 대기 목록을 다시 조회해 전송.
+    변경이 없는 동안은 워커 공용 버전 조회(InviteVersionWatcher)만 사용하므로 DB 부하가 거의 없다.
+    """
+    version = invite_watcher.subscribe(user_id)
+    try:
+        yield b'retry: 3000\n\n'
+        closes_at = time.monotonic() + INVITE_STREAM_MAX_SECONDS
+        while True:
+            if version != last_version:
+                yield invitation_event(user_id, version)
+                last_version = version
+            else:
+                yield b': ping\n\n'  # 프록시가 연결을 끊지 않도록
+            remaining = closes_at - time.monotonic()
+            if remaining <= 0:
+                return  # EventSource가 Last-Event-ID와 함께 다시 연결
+            version = invite_watcher.wait(user_id, version, min(INVITE_STREAM_HEARTBEAT, remaining))
+    finally:
+        invite_watcher.unsubscribe(user_id)
+
+@album_ns.route('/invitations/stream')
+class AlbumInvitationStream(Resource):
+    @album_ns.doc(security='Bearer Auth')
+    @album_ns.param('access_token', 'EventSource용 토큰 (Authorization 헤더 대신)')
+    @token_required(allow_query_token=True)
+    def get(self):
+        """
+        초대 목록 변경 알림 (Server-Sent Events)
+        - 연결 시, 그리고 초대를 받거나 수락/거절하거나 초대한 앨범이 삭제될 때 invitations 이벤트로 대기 목록 전체를 보냄
+        - 이벤트 id는 초대 버전이며, 재연결 시 Last-Event-ID가 현재 버전과 같으면 목록을 다시 보내지 않음
+        - 비동기 워커(GUNICORN_WORKER_CLASS=gevent)에서는 연결을 유지하고,
+          sync 워커에서는 연결이 워커를 붙잡아 timeout에 걸리므로 한 번 응답하고 끊는다 (retry 후 재연결)
+        """
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        last_version = int(last_event_id) if last_event_id.isdigit() else None
+        if can_hold_stream(request.environ):
+            body = invitation_events(request.current_user_id, last_version)
+        else:
+            body = invitation_snapshot(request.current_user_id, last_version)
+        return Response(
+            body,
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
 @album_ns.route('/invitations/<string:invite_token>/accept')
 class AcceptInvitation(Resource):
@@ -112,19 +189,17 @@ class AcceptInvitation(Resource):
         if not album_doc:
             return make_response(404, '유효하지 않은 초대입니다.')
 
-        album_service.member_collection.insert_one({
-            'album_id': album_doc['album_id'],
-            'user_id': user_id,
-            'joined_at': datetime.utcnow()
-        })
+        # 이미 멤버이면(소유자가 자신을 초대한 경우 등) 초대만 수락 처리
+        album_service.add_member(album_doc['album_id'], user_id)
 
         album_service.invite_collection.update_one(
             {'_id': album_doc['_id']},
             {'$set': {'status': 'accepted'}}
         )
+        album_service.user_service.bump_invite_version([user_id])
 
         return make_response(200, '초대를 수락했습니다.', {
-            'album_id': str(album_doc['album_id'])
+            'album_id': album_doc['album_id']
         })
 
 @album_ns.route('/invitations/<string:invite_token>/reject')
@@ -140,6 +215,7 @@ class RejectInvitation(Resource):
 
         if result.matched_count == 0:
             return make_response(404, '거절할 초대가 없습니다.')
+        album_service.user_service.bump_invite_version([user_id])
 
         return make_response(200, '초대를 거절했습니다.')
     
@@ -159,33 +235,39 @@ class UserAlbums(Resource):
         except Exception as e:
             return make_response(400, f'유효하지 않은 user_id: {str(e)}')
 
-        albums = album_service.get_user_albums(user_id)
-        return make_response(200, f'{user_id}의 앨범 목록 조회 성공', albums)
+        album_list = album_service.get_user_album_list(user_id)
+        if album_list is None:
+            return make_response(200, f'{user_id}의 앨범 목록 조회 성공', album_service.get_user_albums(user_id))
+
+        tag = f"albums-{user_id}-{album_list['version']}"
+        cached = not_modified(tag)
+        if cached:
+            return cached
+        response = make_response(200, f'{user_id}의 앨범 목록 조회 성공', album_list['albums'])
+        response.headers.update(etag_headers(tag))
+        return response
     
 @album_ns.route('/<string:album_id>/members')
 @album_ns.param('album_id', '조회할 앨범의 고유 ID')
 class AlbumMembers(Resource):
     @album_ns.doc(security='Bearer Auth')
+    @album_ns.param('limit', f'페이지 크기 (기본 {MEMBER_PAGE_SIZE}, 최대 {MEMBER_PAGE_MAX_SIZE})', type=int)
+    @album_ns.param('skip', '건너뛸 멤버 수 (가입 순)', type=int)
     @token_required
     def get(self, album_id):
         """
         특정 앨범에 속한 멤버 목록 조회
         - 헤더: Authorization: Bearer {access_token}
+        - 쿼리스트링: ?limit=<개수>&skip=<건너뛸 수>
         """
-        album_oid = ObjectId(album_id)
-        album = album_service.collection.find_one({'_id': album_oid})
-        members = album_service.member_collection.find({'album_id': album_oid})
-        result = []
-        for member in members:
-            user = album_service.user_collection.find_one({'_id': member['user_id']})
-            if user:
-                result.append({
-                    'user_id': str(user['_id']),
-                    'nickname': user['nickname'],
-                    'email': user['username'],
-                    'joined_at': member['joined_at'].isoformat() + 'Z',
-                    'is_owner': (album and album['owner_id'] == user['_id'])
-                })
+        limit = request.args.get('limit', MEMBER_PAGE_SIZE, type=int)
+        skip = request.args.get('skip', 0, type=int)
+        if limit < 1 or skip < 0:
+            return make_response(400, 'limit은 1 이상, skip은 0 이상이어야 합니다.')
+
+        result = album_service.get_members(album_id, limit=min(limit, MEMBER_PAGE_MAX_SIZE), skip=skip)
+        if result is None:
+            result = []
         return make_response(200, '앨범 멤버 목록 조회 완료', result)
 
 @album_ns.route('/<string:album_id>/leave')
@@ -208,10 +290,12 @@ class LeaveAlbum(Resource):
         if not member:
             return make_response(404, '해당 앨범의 멤버가 아닙니다.')
 
-        album_service.member_collection.delete_one({
+        result = album_service.member_collection.delete_one({
             'album_id': ObjectId(album_id),
             'user_id': user_id
         })
+        if result.deleted_count:
+            album_service.record_member_change(album_id, -1, user_id)
 
         return make_response(200, '그룹을 나갔습니다.')
 
@@ -219,17 +303,47 @@ class LeaveAlbum(Resource):
 class AlbumDetail(Resource):
     @token_required
     def get(self, album_id):
-        album = album_service.collection.find_one({'_id': ObjectId(album_id)})
+        # ETag 버전은 워커별 캐시가 아닌 DB에서 읽고, 캐시된 문서가 그보다 오래됐으면 다시 읽음
+        version = album_service.get_version(album_id)
+        album = album_service.get_album(album_id, version) if version is not None else None
         if not album:
             return make_response(404, "앨범을 찾을 수 없습니다.", None)
-        return make_response(200, "앨범 조회 성공", {
-            "album_id": str(album['_id']),
+        is_owner = str(album['owner_id']) == str(request.current_user_id)
+        tag = f"album-{album['_id']}-{version}-{int(is_owner)}"
+        cached = not_modified(tag)
+        if cached:
+            return cached
+        response = make_response(200, "앨범 조회 성공", {
+            "album_id": album['_id'],
             "title": album['title'],
             "description": album.get('description', ''),
-            "created_at": album['created_at'].isoformat() + 'Z',
-            "is_owner": str(album['owner_id']) == str(request.current_user_id),
-            "owner_id": str(album['owner_id'])
+            "created_at": album['created_at'],
+            "is_owner": is_owner,
+            "owner_id": album['owner_id']
         })
+        response.headers.update(etag_headers(tag))
+        return response
+
+    @album_ns.expect(update_album_model)
+    @token_required
+    def patch(self, album_id):
+        """
+        앨범 정보 수정 (소유자만)
+        - body: title, description 중 바꿀 값
+        """
+        data = request.json or {}
+        changes = {key: data[key] for key in ('title', 'description') if key in data}
+        if not changes:
+            return make_response(400, "수정할 값이 없습니다.")
+        if 'title' in changes and not changes['title']:
+            return make_response(400, "앨범 이름을 입력해주세요.")
+        album = album_service.collection.find_one({'_id': ObjectId(album_id)}, {'owner_id': 1})
+        if not album:
+            return make_response(404, "앨범을 찾을 수 없습니다.", None)
+        if str(album['owner_id']) != str(request.current_user_id):
+            return make_response(403, "앨범 소유자만 수정할 수 있습니다.")
+        album_service.update_album(album_id, changes)
+        return make_response(200, "앨범 정보가 수정되었습니다.", changes)
 
     @token_required
     def delete(self, album_id):
@@ -246,9 +360,38 @@ class AlbumDetail(Resource):
         })
         if member_count > 0:
             return make_response(400, "구성원이 남아있으면 앨범을 삭제할 수 없습니다.")
-        # 앨범, 멤버, 초대, 사진 등 관련 데이터 삭제
+        # 멤버/초대/사진(파일, 썸네일 포함)은 워커(worker.py)가 배치로 삭제.
+        # 작업을 먼저 등록해, 앨범 삭제 직후 중단되어도 정리할 작업이 남아 있도록 함 (dedupe_key로 재시도해도 하나)
+        job_id = job_service.enqueue(
+            'delete_album',
+            {'album_id': ObjectId(album_id), 'requested_by': user_id},
+            dedupe_key=f'delete_album:{album_id}'
+        )
         album_service.collection.delete_one({'_id': ObjectId(album_id)})
-        album_service.member_collection.delete_many({'album_id': ObjectId(album_id)})
-        album_service.invite_collection.delete_many({'album_id': ObjectId(album_id)})
-        # 사진 등 추가 데이터가 있다면 여기도 삭제
-        return make_response(200, "앨범이 삭제되었습니다.")
\ No newline at end of file
+        album_service.invalidate_album(album_id)
+        album_service.notify_pending_invitees(album_id)
+        album_service.user_service.bump_albums_version([user_id])
+        return make_response(200, "앨범이 삭제되었습니다.", {'job_id': job_id})
+
+@album_ns.route('/jobs/<string:job_id>')
+@album_ns.param('job_id', '앨범 삭제 요청 시 받은 작업 ID')
+class AlbumJob(Resource):
+    @album_ns.doc(security='Bearer Auth')
+    @token_required
+    def get(self, job_id):
+        """
+        백그라운드 작업(앨범 삭제 등) 진행 상황 조회
+        - 헤더: Authorization: Bearer {access_token}
+        """
+        job = job_service.find_by_id(job_id)
+        if not job or str(job['payload'].get('requested_by')) != str(request.current_user_id):
+            return make_response(404, "작업을 찾을 수 없습니다.")
+        return make_response(200, "작업 조회 성공", {
+            'job_id': job['_id'],
+            'type': job['type'],
+            'status': job['status'],
+            'progress': job.get('progress', {}),
+            'attempts': job['attempts'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at']
+        })
\ No newline at end of file
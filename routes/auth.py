@@ -1,39 +1,85 @@
-from flask import request
+from flask import current_app, has_app_context, request
 from flask_restx import Namespace, Resource, fields
 import jwt
 import datetime
 from functools import wraps
-from models.user import User
+from models.user import User, AvailabilityIndex, DuplicateUserError
+from models.rate_limit import SharedRateLimiter
+from models.revoked_token import RevokedToken
+from utils.hashing import HashingOverloaded
+from utils.throttle import RateLimiter
 from bson import ObjectId
-from dotenv import load_dotenv
 import re
 import os
 import logging
-
-load_dotenv()
+import uuid
 
 auth_ns = Namespace('auth', description='인증 관련 API')
-SECRET_KEY = os.getenv("SECRET_KEY")
 ACCESS_TOKEN_EXPIRES = int(os.getenv("ACCESS_TOKEN_EXPIRES", 3600))
 REFRESH_TOKEN_EXPIRES = int(os.getenv("REFRESH_TOKEN_EXPIRES", 1209600))
+LOGIN_IP_LIMIT = int(os.getenv("LOGIN_IP_LIMIT", 30))
+LOGIN_ACCOUNT_FAILURE_LIMIT = int(os.getenv("LOGIN_ACCOUNT_FAILURE_LIMIT", 5))
+LOGIN_THROTTLE_WINDOW = int(os.getenv("LOGIN_THROTTLE_WINDOW", 60))
+REGISTER_IP_LIMIT = int(os.getenv("REGISTER_IP_LIMIT", 10))
 
 user_service = User()
-blacklist = set()
+revocation_store = RevokedToken()
+availability_index = AvailabilityIndex(user_service)
+
+# 로그인 시도 제한: IP별 시도 횟수, 계정별 실패 횟수 / 가입 시도 제한: IP별 시도 횟수
+# 프록시 뒤에서는 TRUSTED_PROXY_COUNT(app.py의 ProxyFix)를 설정해야 remote_addr가 클라이언트 IP가 된다
+# IP별 제한은 워커 메모리에서 세므로 실제 한도는 limit × 워커 수. 계정별 실패 횟수는 여러 IP에서 나눠 시도하는
+# credential stuffing을 막기 위한 것이라 워커/재시작과 관계없이 MongoDB(rate_limits)에 공유한다
+login_ip_limiter = RateLimiter(LOGIN_IP_LIMIT, LOGIN_THROTTLE_WINDOW)
+login_account_limiter = SharedRateLimiter(LOGIN_ACCOUNT_FAILURE_LIMIT, LOGIN_THROTTLE_WINDOW)
+register_ip_limiter = RateLimiter(REGISTER_IP_LIMIT, LOGIN_THROTTLE_WINDOW)
+
+def too_many_requests(retry_after):
+    return {'code': 429, 'message': '요청이 너무 많습니다. 잠시 후 다시 시도해주세요.'}, 429, {'Retry-After': str(retry_after)}
+
+def hashing_overloaded():
+    return {'code': 503, 'message': '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.'}, 503, {'Retry-After': '1'}
+
+def load_identity(user_id):
+    """캐시에서 유저 문서(비밀번호 해시 제외)를 찾고, 없으면 DB에서 읽어 캐시에 저장"""
+    return user_service.get_identity(user_id)
+
+def invalidate_identity(user_id):
+    """계정 삭제/정보 변경 시 캐시된 유저 문서/프로필 무효화"""
+    user_service.invalidate_identity(user_id)
+
+def secret_key():
+    """JWT 서명 키 (create_app에서 설정한 SECRET_KEY, 앱 컨텍스트 밖에서는 환경 변수)"""
+    if has_app_context():
+        return current_app.config['SECRET_KEY']
+    return os.getenv("SECRET_KEY")
 
 def create_tokens(user_id):
+    # jti: 같은 유저에게 같은 초에 발급한 토큰도 서로 달라야 한 세션의 로그아웃(폐기)이 다른 세션을 끊지 않음
     access_token = jwt.encode({
         'user_id': user_id,
+        'jti': uuid.uuid4().hex,
         'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=ACCESS_TOKEN_EXPIRES)
-    }, SECRET_KEY, algorithm='HS256')
+    }, secret_key(), algorithm='HS256')
 
     refresh_token = jwt.encode({
         'user_id': user_id,
+        'jti': uuid.uuid4().hex,
         'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=REFRESH_TOKEN_EXPIRES)
-    }, SECRET_KEY, algorithm='HS256')
+    }, secret_key(), algorithm='HS256')
 
     return access_token, refresh_token
 
-def token_required(f):
+def token_required(f=None, allow_query_token=False):
+    """
+    Authorization: Bearer 토큰 확인.
+    allow_query_token=True면 ?access_token= 도 허용 (헤더를 지정할 수 없는 EventSource용)
+    쿼리 문자열의 토큰은 프록시/gunicorn access log와 브라우저 기록에 그대로 남으므로 EventSource 외에는 쓰지 않는다.
+    (access log를 켠다면 이 경로의 쿼리를 남기지 않도록 설정)
+    """
+    if f is None:
+        return lambda func: token_required(func, allow_query_token=allow_query_token)
+
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -42,15 +88,19 @@ def token_required(f):
             parts = auth_header.split()
             if len(parts) == 2 and parts[0].lower() == 'bearer':
                 token = parts[1]
+        if not token and allow_query_token:
+            token = request.args.get('access_token')
         if not token:
             return {'code': 401, 'message': 'Token is missing'}, 401
 
-        if token in blacklist:
+        if revocation_store.is_revoked(token):
             return {'code': 401, 'message': 'Token has been revoked'}, 401
 
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+            data = jwt.decode(token, secret_key(), algorithms=['HS256'])
             request.current_user_id = data.get('user_id') # JWT -> user_id 제공을 위해 추가
+            request.current_token = token
+            request.token_payload = data
 
             # `user_id`를 ObjectId로 변환
             try:
@@ -58,9 +108,10 @@ def token_required(f):
             except Exception:
                 return {'code': 401, 'message': 'Invalid user ID in token'}, 401
 
-            current_user = user_service.collection.find_one({'_id': user_id})
+            current_user = load_identity(user_id)
             if not current_user:
                 return {'code': 401, 'message': 'User not found'}, 401
+            request.current_user = current_user # 핸들러에서 users 재조회 없이 사용
             
         except jwt.ExpiredSignatureError:
             return {'code': 401, 'message': 'Token has expired'}, 401
@@ -98,17 +149,30 @@ class Register(Resource):
         password = data.get('password')
         nickname = data.get('nickname')
 
+        ip_key = f'ip:{request.remote_addr}'
+        retry_after = register_ip_limiter.retry_after(ip_key)
+        if retry_after:
+            return too_many_requests(retry_after)
+        register_ip_limiter.hit(ip_key)
+
         if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', username):
             return {'code': 400, 'message': '유효하지 않은 이메일 형식입니다.'}, 400
 
-        if user_service.find_by_username(username):
+        # 명백한 중복은 비밀번호 해시 전에 거절 (대부분 DB 조회 없이 판단)
+        if not availability_index.username_available(username):
             return {'code': 400, 'message': '이미 존재하는 이메일입니다.'}, 400
-        if user_service.find_by_nickname(nickname):
+        if not availability_index.nickname_available(nickname):
             return {'code': 400, 'message': '이미 존재하는 닉네임입니다.'}, 400
 
-        user_id = user_service.create_user(username, password, nickname)
-        if not user_id:
-            return {'code': 400, 'message': '회원가입 실패'}, 400
+        try:
+            user_id = user_service.create_user(username, password, nickname)
+        except HashingOverloaded:
+            return hashing_overloaded()
+        except DuplicateUserError as e:
+            if e.field == 'nickname':
+                return {'code': 400, 'message': '이미 존재하는 닉네임입니다.'}, 400
+            return {'code': 400, 'message': '이미 존재하는 이메일입니다.'}, 400
+        availability_index.add(username, nickname)
 
         return {'code': 201, 'message': '회원가입 성공', 'data': {'user_id': user_id}}, 201
 
@@ -121,9 +185,23 @@ class Login(Resource):
         username = data.get('username')
         password = data.get('password')
 
-        user = user_service.verify_user(username, password)
+        ip_key = f'ip:{request.remote_addr}'
+        account_key = f'account:{(username or "").strip().lower()}'
+        account_retry_after, failures = login_account_limiter.status(account_key)
+        retry_after = login_ip_limiter.retry_after(ip_key) or account_retry_after
+        if retry_after:
+            return too_many_requests(retry_after)
+        login_ip_limiter.hit(ip_key)
+
+        try:
+            user = user_service.verify_user(username, password)
+        except HashingOverloaded:
+            return hashing_overloaded()
         if not user:
+            login_account_limiter.hit(account_key)
             return {'code': 401, 'message': '아이디 또는 비밀번호가 올바르지 않습니다.'}, 401
+        if failures:
+            login_account_limiter.reset(account_key)
 
         access_token, refresh_token = create_tokens(str(user['_id']))
 
@@ -157,7 +235,9 @@ class Logout(Resource):
             return {'code': 401, 'message': 'Invalid Authorization header'}, 401
         token = parts[1]
 
-        blacklist.add(token)  # 토큰을 블랙리스트에 추가
+        # 토큰 만료 시각까지만 폐기 목록에 보관 (이후 TTL 인덱스로 자동 삭제)
+        expires_at = datetime.datetime.fromtimestamp(request.token_payload['exp'], datetime.timezone.utc)
+        revocation_store.revoke(token, expires_at)
 
         return {'code': 200, 'message': '로그아웃 성공'}, 200
 
@@ -168,7 +248,7 @@ class NicknameCheck(Resource):
     def post(self):
         data = request.json
         nickname = data.get('value')
-        if user_service.find_by_nickname(nickname):
+        if not availability_index.nickname_available(nickname):
             return {'code': 409, 'message': '이미 사용 중인 닉네임입니다.'}, 409
         return {'code': 200, 'message': '사용 가능한 닉네임입니다.'}, 200
 
@@ -179,7 +259,7 @@ class EmailCheck(Resource):
     def post(self):
         data = request.json
         email = data.get('value')
-        if user_service.find_by_username(email):
+        if not availability_index.username_available(email):
             return {'code': 409, 'message': '이미 사용 중인 이메일입니다.'}, 409
         return {'code': 200, 'message': '사용 가능한 이메일입니다.'}, 200
 
@@ -187,16 +267,16 @@ class EmailCheck(Resource):
 class UserInfo(Resource):
     def get(self, user_id):
         try:
-            user = user_service.collection.find_one({'_id': ObjectId(user_id)})
+            profile = user_service.get_profile(ObjectId(user_id))
         except Exception:
             return {'code': 400, 'message': '유효하지 않은 user_id'}, 400
-        if not user:
+        if not profile:
             return {'code': 404, 'message': '유저를 찾을 수 없습니다.'}, 404
         return {
             'code': 200,
             'message': '유저 정보 조회 성공',
             'data': {
-                'nickname': user.get('nickname', ''),
-                'email': user.get('username', '')
+                'nickname': profile['nickname'],
+                'email': profile['username']
             }
         }, 200
@@ -1,10 +1,17 @@
+import hashlib
+import logging
 import os
 from flask import request, current_app
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from .auth import token_required
 from models.photo import Photo as PhotoModel
+from models.blob import Blob
+from models.album import Album
+from utils import signing, thumbnails
+from utils.response import etag_headers, not_modified
+from utils.static_files import upload_url
 
 photo_ns = Namespace('photos', description='사진 업로드/다운로드 관련 API')
 
@@ -12,6 +19,16 @@ upload_parser = photo_ns.parser()
 upload_parser.add_argument('file', location='files', type=FileStorage, required=True, help='업로드할 이미지 파일')
 upload_parser.add_argument('album_id', location='form', type=str, required=True, help='어느 앨범에 속할지 앨범 ID')
 
+batch_upload_parser = photo_ns.parser()
+batch_upload_parser.add_argument('files', location='files', type=FileStorage, action='append', required=True, help='업로드할 이미지 파일들')
+batch_upload_parser.add_argument('album_id', location='form', type=str, required=True, help='어느 앨범에 속할지 앨범 ID')
+
+thumbnail_model = photo_ns.model('PhotoThumbnail', {
+    'width': fields.Integer(description='최대 변 길이(px)'),
+    'format': fields.String(description='이미지 포맷 (jpeg, webp)'),
+    'url': fields.String(description='썸네일 URL'),
+})
+
 photo_model = photo_ns.model('Photo', {
     'photo_id': fields.String(readonly=True, description='사진 고유 ID'),
     'album_id': fields.String(description='앨범 ID'),
@@ -19,9 +36,82 @@ photo_model = photo_ns.model('Photo', {
     'url': fields.String(description='외부에서 접근 가능한 사진 URL'),
     'original_filename': fields.String(description='원본 파일명'),
     'created_at': fields.DateTime(description='업로드 시각(UTC)'),
+    'thumbnails': fields.List(fields.Nested(thumbnail_model), description='크기별 썸네일 (생성 전이면 빈 목록)'),
+})
+
+batch_item_model = photo_ns.model('PhotoBatchItem', {
+    'index': fields.Integer(description='요청 내 파일 순서 (0부터)'),
+    'original_filename': fields.String(description='원본 파일명'),
+    'status': fields.String(description='created 또는 failed'),
+    'error': fields.String(description='실패 사유'),
+    'photo': fields.Nested(photo_model, allow_null=True, skip_none=True),
+})
+
+batch_result_model = photo_ns.model('PhotoBatchResult', {
+    'created': fields.Integer(description='저장된 파일 수'),
+    'failed': fields.Integer(description='실패한 파일 수'),
+    'results': fields.List(fields.Nested(batch_item_model)),
 })
 
 photo_service = PhotoModel()
+blob_service = Blob()
+album_service = Album()
+
+PHOTO_PAGE_SIZE = int(os.getenv('PHOTO_PAGE_SIZE', 100))
+PHOTO_PAGE_MAX_SIZE = int(os.getenv('PHOTO_PAGE_MAX_SIZE', 500))
+PHOTO_BATCH_MAX_FILES = int(os.getenv('PHOTO_BATCH_MAX_FILES', 500))
+
+
+def store_upload(uploaded_file):
+    ext = os.path.splitext(secure_filename(uploaded_file.filename))[1].lower()
+    return blob_service.store(uploaded_file.stream, ext)
+
+
+def release_upload(doc):
+    blob_service.release_photo(doc)
+
+
+def insert_uploads(docs):
+    """
+    사진 문서 저장. 반환: 실패한 문서 인덱스 -> 오류 메시지 (해당 파일 참조는 호출한 쪽에서 해제)
+    BulkWriteError 외의 예외(네트워크 오류, 타임아웃 등)는 어떤 문서가 저장됐는지 알 수 없으므로
+    저장됐을 수 있는 문서를 지우고 모든 파일 참조를 해제한 뒤 다시 발생시킨다.
+    """
+    try:
+        return photo_service.insert_documents(docs)
+    except Exception:
+        try:
+            photo_service.collection.delete_many({'_id': {'$in': [doc['_id'] for doc in docs if '_id' in doc]}})
+        except Exception:
+            logging.exception('failed to remove partially inserted photos')
+        for doc in docs:
+            release_upload(doc)
+        raise
+
+
+def schedule_thumbnails(doc):
+    """요청 처리와 별개로 썸네일을 생성하고 완료되면 사진 문서에 기록 (앨범 버전도 갱신)"""
+    def on_done(variants):
+        photo_service.set_variants(doc['_id'], variants)
+        album_service.record_photo_updated(doc['album_id'])
+
+    thumbnails.submit(doc['filename'], doc['content_hash'], on_done)
+
+
+def to_photo_response(doc):
+    return {
+        'photo_id': str(doc['_id']),
+        'album_id': doc['album_id'],
+        'user_id': doc['user_id'],
+        'url': upload_url(doc['filename']),
+        'original_filename': doc['original_filename'],
+        'created_at': doc['created_at'].isoformat() + 'Z',
+        'thumbnails': [{
+            'width': variant['width'],
+            'format': variant['format'],
+            'url': upload_url(variant['filename']),
+        } for variant in doc.get('variants', [])]
+    }
 
 @photo_ns.route('/')
 class PhotoList(Resource):
@@ -46,40 +136,37 @@ class PhotoList(Resource):
             photo_ns.abort(400, '파일을 첨부해주세요.')
 
         original_filename = uploaded_file.filename
-        filename = secure_filename(original_filename)
-
-        base_dir = os.path.dirname(__file__)
-        upload_folder = os.path.abspath(os.path.join(base_dir, '../uploads'))
-        os.makedirs(upload_folder, exist_ok=True)
-
-        save_path = os.path.join(upload_folder, filename)
-        uploaded_file.save(save_path)
-
-        photo_id = photo_service.create(album_id=album_id,
-                                        user_id=user_id,
-                                        filename=filename,
-                                        original_filename=original_filename)
+        filename, content_hash = store_upload(uploaded_file)
 
-        base_url = request.host_url.rstrip('/')
-        file_url = f"{base_url}/uploads/{filename}"
+        doc = photo_service.new_document(album_id=album_id,
+                                         user_id=user_id,
+                                         filename=filename,
+                                         original_filename=original_filename,
+                                         content_hash=content_hash)
+        errors = insert_uploads([doc])
+        if errors:
+            release_upload(doc)
+            photo_ns.abort(500, 'DB에 사진 메타 저장 중 오류가 발생했습니다.')
+        album_service.record_photos_added(album_id, [doc])
+        schedule_thumbnails(doc)
 
-        return {
-            'photo_id': photo_id,
-            'album_id': album_id,
-            'user_id': user_id,
-            'url': file_url,
-            'original_filename': original_filename,
-            'created_at': photo_service.find_by_id(photo_id)['created_at'].isoformat() + 'Z'
-        }, 201
+        return to_photo_response(doc), 201
 
     @photo_ns.doc(security='Bearer Auth')
     @token_required
     @photo_ns.param('album_id', '조회할 앨범 ID (쿼리스트링)')
-    @photo_ns.marshal_list_with(photo_model, code=200)
+    @photo_ns.param('limit', f'페이지 크기 (cursor만 지정하면 {PHOTO_PAGE_SIZE}, 최대 {PHOTO_PAGE_MAX_SIZE}). limit/cursor가 없으면 전체 목록', type=int)
+    @photo_ns.param('cursor', '이전 응답의 X-Next-Cursor 헤더 값')
+    @photo_ns.param('sort', 'oldest(기본) 또는 newest', enum=['oldest', 'newest'])
+    @photo_ns.header('X-Next-Cursor', '다음 페이지 cursor (마지막 페이지면 없음)')
+    @photo_ns.header('ETag', '앨범 버전 기반 ETag (If-None-Match가 같으면 304)')
+    @photo_ns.response(200, 'Success', [photo_model])
+    @photo_ns.response(304, '변경 없음')
     def get(self):
         """
-        특정 앨범에 속한 사진 메타데이터 리스트 조회.
-        - 쿼리스트링: ?album_id=<앨범ID>
+        특정 앨범에 속한 사진 메타데이터 리스트 조회 (업로드 시각 기준 페이지네이션).
+        - 쿼리스트링: ?album_id=<앨범ID>&limit=<개수>&cursor=<X-Next-Cursor>&sort=oldest|newest
+        - limit/cursor를 보내지 않으면 이전과 같이 전체 목록을 업로드 순으로 반환
         - 헤더: Authorization: Bearer {access_token}
         """
         album_id = request.args.get('album_id')
@@ -87,20 +174,111 @@ class PhotoList(Resource):
             photo_ns.abort(400, '쿼리스트링에 album_id를 지정해주세요.')
         # 필요하다면 “소유자(owner_id) 체크”를 추가할 수 있음
 
-        docs = photo_service.find_by_album(album_id)
-        result = []
-        base_url = request.host_url.rstrip('/')
-        for doc in docs:
-            file_url = f"{base_url}/uploads/{doc['filename']}"
-            result.append({
-                'photo_id': str(doc['_id']),
-                'album_id': doc['album_id'],
-                'user_id': doc['user_id'],
-                'url': file_url,
-                'original_filename': doc['original_filename'],
-                'created_at': doc['created_at'].isoformat() + 'Z'
-            })
-        return result, 200
+        limit = None
+        if 'limit' in request.args or 'cursor' in request.args:
+            limit = request.args.get('limit', PHOTO_PAGE_SIZE, type=int)
+            if limit < 1:
+                photo_ns.abort(400, 'limit은 1 이상이어야 합니다.')
+            limit = min(limit, PHOTO_PAGE_MAX_SIZE)
+
+        sort = request.args.get('sort', 'oldest')
+        if sort not in ('newest', 'oldest'):
+            photo_ns.abort(400, 'sort는 newest 또는 oldest만 가능합니다.')
+
+        cursor = request.args.get('cursor')
+        # 버전을 사진 조회보다 먼저 읽음 (조회 중 바뀌면 다음 요청의 ETag가 달라져 다시 받게 됨)
+        # 사진 URL 서명이 바뀌는 구간(expires_at)도 ETag에 포함
+        version = album_service.get_version(album_id)
+        tag = None
+        if version is not None:
+            query_key = hashlib.sha1(f'{limit}:{sort}:{cursor}:{signing.expires_at()}'.encode()).hexdigest()[:16]
+            tag = f'photos-{album_id}-{version}-{query_key}'
+            cached = not_modified(tag)
+            if cached:
+                return cached
+
+        try:
+            docs, next_cursor = photo_service.find_page_by_album(
+                album_id, limit,
+                cursor=cursor,
+                newest_first=(sort == 'newest')
+            )
+        except ValueError:
+            photo_ns.abort(400, '유효하지 않은 cursor입니다.')
+        result = marshal([to_photo_response(doc) for doc in docs], photo_model)
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        if tag:
+            headers.update(etag_headers(tag))
+        return result, 200, headers
+
+@photo_ns.route('/batch')
+class PhotoBatchUpload(Resource):
+    @photo_ns.doc(security='Bearer Auth')
+    @token_required
+    @photo_ns.expect(batch_upload_parser)
+    @photo_ns.marshal_with(batch_result_model, code=201)
+    @photo_ns.response(207, '일부 파일만 저장됨', batch_result_model)
+    def post(self):
+        """
+        사진 여러 장 한 번에 업로드
+        - multipart/form-data로
+          - files        : (File, 여러 개) 업로드할 이미지들
+          - album_id     : (str) 해당 앨범 ID
+        - 헤더: Authorization: Bearer {access_token}
+        - 파일별 결과를 반환 (모두 성공 201, 일부 실패 207, 모두 실패 400)
+        """
+        args = batch_upload_parser.parse_args()
+        files = args.get('files') or []
+        album_id = args.get('album_id')
+        user_id = request.current_user_id
+
+        if not files:
+            photo_ns.abort(400, '파일을 첨부해주세요.')
+        if len(files) > PHOTO_BATCH_MAX_FILES:
+            photo_ns.abort(400, f'한 번에 최대 {PHOTO_BATCH_MAX_FILES}개까지 업로드할 수 있습니다.')
+
+        results = []
+        docs = []
+        for index, uploaded_file in enumerate(files):
+            item = {'index': index, 'original_filename': uploaded_file.filename}
+            results.append(item)
+            if not uploaded_file.filename:
+                item.update(status='failed', error='파일명이 없습니다.')
+                continue
+            try:
+                filename, content_hash = store_upload(uploaded_file)
+            except Exception as e:
+                item.update(status='failed', error=f'파일 저장 실패: {e}')
+                continue
+            doc = photo_service.new_document(album_id=album_id,
+                                             user_id=user_id,
+                                             filename=filename,
+                                             original_filename=uploaded_file.filename,
+                                             content_hash=content_hash)
+            item['doc_index'] = len(docs)
+            docs.append(doc)
+
+        errors = insert_uploads(docs)
+
+        for item in results:
+            if 'doc_index' not in item:
+                continue
+            doc_index = item.pop('doc_index')
+            doc = docs[doc_index]
+            error = errors.get(doc_index)
+            if error:
+                release_upload(doc)
+                item.update(status='failed', error=error)
+                continue
+            schedule_thumbnails(doc)
+            item.update(status='created', photo=to_photo_response(doc))
+
+        album_service.record_photos_added(album_id, [doc for i, doc in enumerate(docs) if i not in errors])
+
+        created = sum(1 for item in results if item['status'] == 'created')
+        failed = len(results) - created
+        code = 201 if failed == 0 else (207 if created else 400)
+        return {'created': created, 'failed': failed, 'results': results}, code
 
 @photo_ns.route('/<string:photo_id>')
 @photo_ns.param('photo_id', '조회할 사진의 고유 ID')
@@ -117,17 +295,7 @@ class PhotoDetail(Resource):
         if not doc:
             photo_ns.abort(404, '해당 ID의 사진이 없습니다.')
 
-        base_url = request.host_url.rstrip('/')
-        file_url = f"{base_url}/uploads/{doc['filename']}"
-
-        return {
-            'photo_id': str(doc['_id']),
-            'album_id': doc['album_id'],
-            'user_id': doc['user_id'],
-            'url': file_url,
-            'original_filename': doc['original_filename'],
-            'created_at': doc['created_at'].isoformat() + 'Z'
-        }, 200
+        return to_photo_response(doc), 200
 
     @photo_ns.doc(security='Bearer Auth')
     @token_required
@@ -140,15 +308,11 @@ class PhotoDetail(Resource):
         if not doc:
             photo_ns.abort(404, '해당 ID의 사진이 없습니다.')
 
-        filename = doc['filename']
-        base_dir = os.path.dirname(__file__)
-        upload_folder = os.path.abspath(os.path.join(base_dir, '../uploads'))
-        file_path = os.path.join(upload_folder, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
         success = photo_service.delete(photo_id)
         if not success:
             photo_ns.abort(500, 'DB에서 사진 메타 삭제 중 오류가 발생했습니다.')
 
+        album_service.record_photo_removed(doc['album_id'], doc['_id'])
+        release_upload(doc)
+
         return {'message': '사진이 삭제되었습니다.'}, 200
\ No newline at end of file
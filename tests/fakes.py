@@ -0,0 +1,68 @@
+"""테스트용 가짜 객체"""
+
+
+class FakeClientError(Exception):
+    pass
+
+
+class _Exceptions:
+    ClientError = FakeClientError
+
+
+class _Paginator:
+    def __init__(self, client, page_size):
+        self.client = client
+        self.page_size = page_size
+
+    def paginate(self, Bucket, Prefix=''):
+        keys = sorted(key for key in self.client.objects.get(Bucket, {}) if key.startswith(Prefix))
+        for start in range(0, len(keys), self.page_size):
+            yield {'Contents': [{'Key': key} for key in keys[start:start + self.page_size]]}
+
+
+class FakeS3Client:
+    """S3Storage가 사용하는 boto3 S3 클라이언트 메서드만 메모리로 구현"""
+
+    exceptions = _Exceptions
+
+    def __init__(self, page_size=1000):
+        self.objects = {}  # bucket -> {key: (body, extra_args)}
+        self.page_size = page_size
+
+    def _bucket(self, bucket):
+        return self.objects.setdefault(bucket, {})
+
+    def head_object(self, Bucket, Key):
+        if Key not in self._bucket(Bucket):
+            raise FakeClientError('404')
+        return {'ContentLength': len(self._bucket(Bucket)[Key][0])}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self._bucket(bucket)[key] = (fileobj.read(), ExtraArgs or {})
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        with open(filename, 'rb') as f:
+            self.upload_fileobj(f, bucket, key, ExtraArgs)
+
+    def download_file(self, bucket, key, filename):
+        if key not in self._bucket(bucket):
+            raise FakeClientError('404')
+        with open(filename, 'wb') as f:
+            f.write(self._bucket(bucket)[key][0])
+
+    def delete_object(self, Bucket, Key):
+        self._bucket(Bucket).pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete['Objects']:
+            self._bucket(Bucket).pop(item['Key'], None)
+
+    def get_paginator(self, name):
+        assert name == 'list_objects_v2'
+        return _Paginator(self, self.page_size)
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+    def body(self, bucket, key):
+        return self._bucket(bucket)[key][0]
@@ -0,0 +1,109 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from models import blob as blob_module
+from models import db as mongo_db
+from models.blob import Blob
+from utils import storage
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover
+    mongomock = None
+
+
+@unittest.skipIf(mongomock is None, 'mongomock이 필요합니다')
+class BlobTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = storage.LocalStorage(self.tmp.name)
+        self._saved_client = (mongo_db._client, mongo_db._client_pid)
+        mongo_db._client = mongomock.MongoClient()
+        mongo_db._client_pid = os.getpid()
+        self.blobs = Blob()
+        self.collection = self.blobs.collection
+        patcher = mock.patch.object(storage, 'get_storage', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        mongo_db._client, mongo_db._client_pid = self._saved_client
+        self.tmp.cleanup()
+
+    def _deleting(self, digest, deleting_at):
+        self.collection.insert_one({
+            '_id': digest, 'filename': f'{digest}.jpg', 'size': 1, 'refcount': 0,
+            'state': 'deleting', 'deleting_at': deleting_at, 'released': ['old-photo']
+        })
+
+    def test_store_and_release_last_reference(self):
+        filename, digest = self.blobs.store(io.BytesIO(b'data'), '.jpg')
+        again, _ = self.blobs.store(io.BytesIO(b'data'), '.jpg')
+
+        self.assertEqual(filename, again)
+        self.assertEqual(digest, hashlib.sha256(b'data').hexdigest())
+        self.assertEqual(self.collection.find_one({'_id': digest})['refcount'], 2)
+
+        self.blobs.release_content(digest, 'photo-1')
+        self.assertTrue(self.store.exists(filename))
+        self.blobs.release_content(digest, 'photo-2')
+        self.assertFalse(self.store.exists(filename))
+        self.assertIsNone(self.collection.find_one({'_id': digest}))
+
+    def test_acquire_waits_while_deleting(self):
+        self._deleting('d1', datetime.now(timezone.utc))
+
+        # 대기 중에 삭제가 끝남
+        def finish_delete(_):
+            self.collection.delete_one({'_id': 'd1'})
+
+        with mock.patch.object(blob_module.time, 'sleep', side_effect=finish_delete) as sleep:
+            filename, is_new = self.blobs.acquire('d1', 'd1.png', 2)
+
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual((filename, is_new), ('d1.png', True))
+        blob = self.collection.find_one({'_id': 'd1'})
+        self.assertEqual(blob['refcount'], 1)
+        self.assertNotIn('state', blob)
+
+    def test_acquire_takes_over_stale_delete(self):
+        stale = datetime.now(timezone.utc) - timedelta(seconds=blob_module.BLOB_DELETE_TIMEOUT + 1)
+        self._deleting('d1', stale)
+
+        with mock.patch.object(blob_module.time, 'sleep') as sleep:
+            filename, is_new = self.blobs.acquire('d1', 'd1.png', 2)
+
+        sleep.assert_not_called()
+        self.assertEqual((filename, is_new), ('d1.png', True))
+        blob = self.collection.find_one({'_id': 'd1'})
+        self.assertEqual(blob['refcount'], 1)
+        self.assertNotIn('state', blob)
+        self.assertNotIn('released', blob)
+
+    def test_release_same_photo_twice_decrements_once(self):
+        for _ in range(3):
+            self.blobs.acquire('d1', 'd1.jpg', 1)
+
+        self.assertIsNone(self.blobs.release('d1', 'photo-1'))
+        self.assertIsNone(self.blobs.release('d1', 'photo-1'))
+
+        self.assertEqual(self.collection.find_one({'_id': 'd1'})['refcount'], 2)
+
+    def test_retried_release_of_deleting_blob_returns_filename(self):
+        self.blobs.acquire('d1', 'd1.jpg', 1)
+
+        self.assertEqual(self.blobs.release('d1', 'photo-1'), 'd1.jpg')
+        # 파일 삭제 전에 중단되어 같은 사진을 다시 해제하면 삭제를 이어서 할 수 있어야 함
+        self.assertEqual(self.blobs.release('d1', 'photo-1'), 'd1.jpg')
+        self.assertIsNone(self.blobs.release('d1', 'photo-2'))
+        blob = self.collection.find_one({'_id': 'd1'})
+        self.assertEqual((blob['refcount'], blob['state']), (0, 'deleting'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from models import db as mongo_db
+from models.indexes import INDEXES
+from models.job import Job, LeaseLost
+from utils import storage
+import worker
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover
+    mongomock = None
+
+
+@unittest.skipIf(mongomock is None, 'mongomock이 필요합니다')
+class JobTest(unittest.TestCase):
+    def setUp(self):
+        self._saved_client = (mongo_db._client, mongo_db._client_pid)
+        mongo_db._client = mongomock.MongoClient()
+        mongo_db._client_pid = os.getpid()
+        self.jobs = Job()
+
+    def tearDown(self):
+        mongo_db._client, mongo_db._client_pid = self._saved_client
+
+    def test_heartbeat_after_lease_lost(self):
+        self.jobs.enqueue('noop', {})
+        job_a = self.jobs.claim('worker-a', lease_seconds=-1)  # 바로 만료
+        job_b = self.jobs.claim('worker-b')
+
+        self.assertEqual(job_a['_id'], job_b['_id'])
+        with self.assertRaises(LeaseLost):
+            self.jobs.heartbeat(job_a, {'$inc': {'progress.done': 1}})
+        with self.assertRaises(LeaseLost):
+            self.jobs.complete(job_a)
+
+        self.jobs.heartbeat(job_b, {'$inc': {'progress.done': 1}})
+        self.jobs.complete(job_b)
+        doc = self.jobs.collection.find_one({'_id': job_b['_id']})
+        self.assertEqual((doc['status'], doc['attempts'], doc['progress']), ('done', 2, {'done': 1}))
+
+    def test_enqueue_dedupes_unfinished_job(self):
+        self.jobs.collection.create_indexes(INDEXES['jobs'])
+        first = self.jobs.enqueue('noop', {}, dedupe_key='k')
+        self.assertEqual(self.jobs.enqueue('noop', {}, dedupe_key='k'), first)
+
+        self.jobs.complete(self.jobs.claim('worker-a'))
+        self.assertNotEqual(self.jobs.enqueue('noop', {}, dedupe_key='k'), first)
+
+
+@unittest.skipIf(mongomock is None, 'mongomock이 필요합니다')
+class DeleteAlbumJobTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = storage.LocalStorage(self.tmp.name)
+        self._saved_client = (mongo_db._client, mongo_db._client_pid)
+        mongo_db._client = mongomock.MongoClient()
+        mongo_db._client_pid = os.getpid()
+        patcher = mock.patch.object(storage, 'get_storage', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.db = mongo_db.get_db()
+        self.owner_id = self.db['users'].insert_one({'username': 'o@x.com', 'nickname': 'o'}).inserted_id
+        self.album_id = self.db['albums'].insert_one({'owner_id': self.owner_id, 'title': 't'}).inserted_id
+        self.other_album_id = self.db['albums'].insert_one({'owner_id': self.owner_id, 'title': 'o'}).inserted_id
+        # 삭제할 앨범의 사진 2장과 다른 앨범의 사진 1장이 같은 파일을 참조
+        for album_id in (self.album_id, self.album_id, self.other_album_id):
+            filename, digest = worker.blob_service.store(io.BytesIO(b'shared'), '.jpg')
+            self.db['photos'].insert_one({'album_id': str(album_id), 'filename': filename, 'content_hash': digest})
+        self.digest, self.filename = digest, filename
+
+    def tearDown(self):
+        mongo_db._client, mongo_db._client_pid = self._saved_client
+        self.tmp.cleanup()
+
+    def test_resumes_pending_release_without_double_release(self):
+        worker.job_service.enqueue('delete_album', {'album_id': self.album_id, 'requested_by': self.owner_id})
+        job = worker.job_service.claim('worker-a')
+        heartbeat = worker.job_service.heartbeat
+
+        # 첫 사진의 파일을 해제한 직후(pending_release에서 빼기 전) 워커가 죽음
+        def crash_on_pull(job, update=None, **kwargs):
+            if '$pull' in (update or {}):
+                raise RuntimeError('crash')
+            return heartbeat(job, update, **kwargs)
+
+        with mock.patch.object(worker.job_service, 'heartbeat', side_effect=crash_on_pull):
+            with self.assertRaises(RuntimeError):
+                worker.delete_album(job)
+        saved = worker.job_service.collection.find_one({'_id': job['_id']})
+        self.assertEqual(len(saved['pending_release']), 2)
+        self.assertEqual(self.db['blobs'].find_one({'_id': self.digest})['refcount'], 2)
+
+        # lease 만료 후 다른 워커가 이어서 처리
+        worker.job_service.collection.update_one(
+            {'_id': job['_id']}, {'$set': {'lease_until': datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        resumed = worker.job_service.claim('worker-b')
+        worker.delete_album(resumed)
+        worker.job_service.complete(resumed)
+
+        done = worker.job_service.collection.find_one({'_id': job['_id']})
+        self.assertEqual(done['status'], 'done')
+        self.assertEqual(done['pending_release'], [])
+        self.assertEqual(done['progress'], {'photos_total': 2, 'photos_deleted': 2})
+        self.assertEqual(self.db['blobs'].find_one({'_id': self.digest})['refcount'], 1)
+        self.assertTrue(self.store.exists(self.filename))
+        self.assertEqual(self.db['photos'].count_documents({'album_id': str(self.album_id)}), 0)
+        self.assertIsNone(self.db['albums'].find_one({'_id': self.album_id}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+import unittest
+
+from tests.fakes import FakeS3Client
+from utils import storage
+
+DIGEST = 'ab' + 'c' * 62
+
+
+class LocalStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = storage.LocalStorage(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_stream_uses_sharded_path(self):
+        self.store.save_stream(io.BytesIO(b'photo'), f'{DIGEST}.jpg')
+
+        self.assertEqual(self.store.relative_path(f'{DIGEST}.jpg'), os.path.join('ab', 'cc', f'{DIGEST}.jpg'))
+        with open(self.store.local_path(f'{DIGEST}.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), b'photo')
+
+    def test_reads_legacy_flat_file(self):
+        with open(os.path.join(self.tmp.name, 'IMG_0001.jpg'), 'wb') as f:
+            f.write(b'legacy')
+
+        self.assertTrue(self.store.exists('IMG_0001.jpg'))
+        self.store.remove('IMG_0001.jpg')
+        self.assertFalse(self.store.exists('IMG_0001.jpg'))
+
+    def test_rejects_path_traversal(self):
+        self.assertIsNone(self.store.local_path('../secret.jpg'))
+
+
+class S3StorageTest(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeS3Client(page_size=2)
+        self.store = storage.S3Storage('bucket', prefix='uploads/', client=self.client)
+
+    def test_save_stream_and_exists(self):
+        self.assertFalse(self.store.exists(f'{DIGEST}.jpg'))
+        self.store.save_stream(io.BytesIO(b'photo'), f'{DIGEST}.jpg')
+
+        key = f'uploads/ab/cc/{DIGEST}.jpg'
+        self.assertTrue(self.store.exists(f'{DIGEST}.jpg'))
+        self.assertEqual(self.client.body('bucket', key), b'photo')
+        extra = self.client.objects['bucket'][key][1]
+        self.assertEqual(extra['ContentType'], 'image/jpeg')
+
+    def test_save_file_removes_source(self):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'moved')
+
+        self.store.save_file(path, f'{DIGEST}.png')
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.client.body('bucket', f'uploads/ab/cc/{DIGEST}.png'), b'moved')
+
+    def test_remove_and_remove_prefix(self):
+        self.store.save_stream(io.BytesIO(b'photo'), f'{DIGEST}.jpg')
+        for width in (256, 1024, 2048):
+            self.store.save_stream(io.BytesIO(b'thumb'), f'thumbs/{DIGEST}_w{width}.jpg')
+        self.store.save_stream(io.BytesIO(b'other'), 'thumbs/' + 'ab' + 'd' * 62 + '_w256.jpg')
+
+        self.store.remove_prefix('thumbs', f'{DIGEST}_w')
+        self.store.remove(f'{DIGEST}.jpg')
+
+        self.assertEqual(list(self.client.objects['bucket']), ['uploads/thumbs/ab/dd/' + 'ab' + 'd' * 62 + '_w256.jpg'])
+
+    def test_local_copy_downloads_and_cleans_up(self):
+        self.store.save_stream(io.BytesIO(b'photo'), f'{DIGEST}.jpg')
+
+        with self.store.local_copy(f'{DIGEST}.jpg') as path:
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'photo')
+        self.assertFalse(os.path.exists(path))
+
+    def test_url_is_presigned(self):
+        self.assertIn(f'uploads/ab/cc/{DIGEST}.jpg', self.store.url(f'{DIGEST}.jpg', expires_in=60))
+
+
+if __name__ == '__main__':
+    unittest.main()
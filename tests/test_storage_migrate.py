@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from models import db as mongo_db
+from models.album import Album
+from models import storage_migrate
+from tests.fakes import FakeS3Client
+from utils import storage
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover
+    mongomock = None
+
+
+def _write(folder, filename, data):
+    path = os.path.join(folder, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+@unittest.skipIf(mongomock is None, 'mongomock이 필요합니다')
+class StorageMigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.legacy_root = self.tmp.name
+        self._saved_client = (mongo_db._client, mongo_db._client_pid)
+        mongo_db._client = mongomock.MongoClient()
+        mongo_db._client_pid = os.getpid()
+        self.db = mongo_db.get_db()
+        self.album_id = self.db['albums'].insert_one({'title': 't', 'version': 0}).inserted_id
+
+    def tearDown(self):
+        mongo_db._client, mongo_db._client_pid = self._saved_client
+        self.tmp.cleanup()
+
+    def _legacy_photo(self, filename, data=None):
+        if data is not None:
+            _write(self.legacy_root, filename, data)
+        self.db['photos'].insert_one({'album_id': str(self.album_id), 'filename': filename, 'content_hash': None})
+
+    def _album_version(self):
+        return self.db['albums'].find_one({'_id': self.album_id})['version']
+
+    def test_moves_flat_content_hash_files(self):
+        digest = hashlib.sha256(b'x').hexdigest()
+        _write(self.legacy_root, f'{digest}.jpg', b'x')
+        _write(self.legacy_root, f'thumbs/{digest}_w256.jpg', b't')
+        _write(self.legacy_root, 'IMG_0001.jpg', b'legacy')
+        store = storage.LocalStorage(self.legacy_root)
+
+        moved = storage_migrate.migrate_flat_files(store, self.legacy_root)
+
+        self.assertEqual(moved, 2)
+        self.assertEqual(store.relative_path(f'{digest}.jpg'), os.path.join(digest[:2], digest[2:4], f'{digest}.jpg'))
+        self.assertEqual(store.relative_path(f'thumbs/{digest}_w256.jpg'),
+                         os.path.join('thumbs', digest[:2], digest[2:4], f'{digest}_w256.jpg'))
+        self.assertTrue(os.path.isfile(os.path.join(self.legacy_root, 'IMG_0001.jpg')))
+        self.assertEqual(storage_migrate.migrate_flat_files(store, self.legacy_root), 0)
+
+    def test_converts_legacy_photos_to_shared_blobs(self):
+        self._legacy_photo('IMG_0001.jpg', b'same')
+        self._legacy_photo('IMG_0002.jpg', b'same')
+        self._legacy_photo('IMG_0003.jpg')  # 파일 없음
+        store = storage.LocalStorage(self.legacy_root)
+
+        converted, missing = storage_migrate.migrate_legacy_photos(store, self.legacy_root, batch_size=1)
+
+        digest = hashlib.sha256(b'same').hexdigest()
+        self.assertEqual((converted, missing), (2, 1))
+        self.assertEqual(self.db['blobs'].find_one({'_id': digest})['refcount'], 2)
+        self.assertEqual(self.db['photos'].count_documents({'content_hash': digest, 'filename': f'{digest}.jpg'}), 2)
+        self.assertTrue(store.exists(f'{digest}.jpg'))
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_root, 'IMG_0001.jpg')))
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_root, 'IMG_0002.jpg')))
+        self.assertEqual(self._album_version(), 2)  # 변환한 배치마다 ETag가 바뀌도록
+        self.assertNotIn(storage_migrate.LEGACY_FILENAME_INDEX.document['name'],
+                         self.db['photos'].index_information())
+
+    def test_interrupted_run_cleans_up_finished_batches(self):
+        self._legacy_photo('a.jpg', b'a')
+        self._legacy_photo('shared.jpg', b'shared')
+        self._legacy_photo('shared.jpg')  # 같은 이전 파일을 참조하는 문서
+        store = storage.LocalStorage(self.legacy_root)
+
+        # 두 번째 배치 처리 후 중단
+        with mock.patch.object(Album, 'record_photo_updated', side_effect=[None, RuntimeError('stop')]):
+            with self.assertRaises(RuntimeError):
+                storage_migrate.migrate_legacy_photos(store, self.legacy_root, batch_size=1)
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_root, 'a.jpg')))
+        self.assertTrue(os.path.exists(os.path.join(self.legacy_root, 'shared.jpg')))
+
+        converted, missing = storage_migrate.migrate_legacy_photos(store, self.legacy_root, batch_size=1)
+
+        self.assertEqual((converted, missing), (1, 0))
+        self.assertEqual(self.db['photos'].count_documents({'content_hash': None}), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_root, 'shared.jpg')))
+
+    def test_dry_run_changes_nothing(self):
+        self._legacy_photo('IMG_0001.jpg', b'data')
+        store = storage.LocalStorage(self.legacy_root)
+
+        converted, missing = storage_migrate.migrate_legacy_photos(store, self.legacy_root, dry_run=True)
+
+        self.assertEqual((converted, missing), (1, 0))
+        self.assertEqual(self.db['blobs'].count_documents({}), 0)
+        self.assertIsNone(self.db['photos'].find_one()['content_hash'])
+        self.assertTrue(os.path.isfile(os.path.join(self.legacy_root, 'IMG_0001.jpg')))
+
+    def test_migrates_into_s3(self):
+        digest = hashlib.sha256(b'x').hexdigest()
+        _write(self.legacy_root, f'{digest}.jpg', b'x')
+        self._legacy_photo('IMG_0001.jpg', b'legacy')
+        client = FakeS3Client()
+        store = storage.S3Storage('bucket', client=client)
+
+        moved = storage_migrate.migrate_flat_files(store, self.legacy_root)
+        converted, missing = storage_migrate.migrate_legacy_photos(store, self.legacy_root)
+
+        legacy_digest = hashlib.sha256(b'legacy').hexdigest()
+        self.assertEqual((moved, converted, missing), (1, 1, 0))
+        self.assertEqual(client.body('bucket', f'{digest[:2]}/{digest[2:4]}/{digest}.jpg'), b'x')
+        self.assertEqual(client.body('bucket', f'{legacy_digest[:2]}/{legacy_digest[2:4]}/{legacy_digest}.jpg'),
+                         b'legacy')
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_root, f'{digest}.jpg')))
+        self.assertFalse(os.path.exists(os.path.join(self.legacy_root, 'IMG_0001.jpg')))
+
+
+if __name__ == '__main__':
+    unittest.main()
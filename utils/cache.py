@@ -0,0 +1,198 @@
+"""
+캐시 백엔드
+
+- TTLCache: 워커 내 LRU + TTL
+- RedisCache: 워커/서버 간 공유 (redis 패키지 필요). 값은 BSON으로 저장해 ObjectId/datetime을 그대로 돌려준다
+
+create_cache(name)는 CACHE_BACKEND=memory(기본)|redis 설정에 따라 백엔드를 골라 만든다.
+memory 백엔드의 무효화는 같은 워커에만 적용되므로, 다른 워커는 TTL 동안 이전 값을 볼 수 있다.
+"""
+from utils import metrics
+import bson
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'albumate:')
+
+
+class CacheStats:
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()  # += 는 원자적이지 않으므로 스레드 워커에서 값이 빠지지 않도록
+
+    def record(self, hit, count=1):
+        with self._stats_lock:
+            if hit:
+                self.hits += count
+            else:
+                self.misses += count
+        if self.name:
+            metrics.record_cache(self.name, hit, count)
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else None}
+
+
+class TTLCache(CacheStats):
+    """크기 제한(LRU) + 만료 시간(TTL)을 갖는 프로세스 내 캐시"""
+
+    def __init__(self, maxsize=10000, ttl=60, name=None):
+        super().__init__(name)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] <= now:
+                del self._data[key]
+                item = None
+            if item is None:
+                self.record(False)
+                return default
+            self._data.move_to_end(key)
+            self.record(True)
+            return item[0]
+
+    def get_many(self, keys):
+        """{key: value} (없는 key는 제외)"""
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache(CacheStats):
+    """
+    Redis 공유 캐시. client는 redis.Redis 호환 객체 (테스트에서는 fakeredis 등으로 대체 가능).
+    """
+
+    def __init__(self, client, prefix, ttl=60, name=None):
+        super().__init__(name)
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key):
+        return self.prefix + key
+
+    @staticmethod
+    def _dumps(value):
+        return bson.encode({'v': value})
+
+    @staticmethod
+    def _loads(raw):
+        return bson.decode(raw)['v']
+
+    def get(self, key, default=None):
+        raw = self.client.get(self._key(key))
+        self.record(raw is not None)
+        return default if raw is None else self._loads(raw)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raws = self.client.mget([self._key(key) for key in keys])
+        result = {key: self._loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        self.record(True, len(result))
+        self.record(False, len(keys) - len(result))
+        return result
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), self._dumps(value), ex=max(1, int(self.ttl if ttl is None else ttl)))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def delete_many(self, keys):
+        keys = [self._key(key) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+_redis_client = None
+_redis_lock = threading.Lock()
+caches = {}
+
+
+def get_redis_client():
+    global _redis_client
+    if redis is None:
+        raise RuntimeError('CACHE_BACKEND=redis 를 사용하려면 redis 패키지가 필요합니다.')
+    with _redis_lock:
+        if _redis_client is None:
+            # redis-py 커넥션 풀은 fork 이후 자식 프로세스에서 연결을 새로 만든다
+            _redis_client = redis.Redis.from_url(CACHE_REDIS_URL)
+    return _redis_client
+
+
+def create_cache(name, maxsize=10000, ttl=60):
+    """CACHE_BACKEND 설정에 맞는 캐시 생성 (cache_stats()에서 조회할 수 있도록 이름으로 등록)"""
+    if CACHE_BACKEND == 'redis':
+        cache = RedisCache(get_redis_client(), prefix=f'{CACHE_KEY_PREFIX}{name}:', ttl=ttl, name=name)
+    else:
+        cache = TTLCache(maxsize=maxsize, ttl=ttl, name=name)
+    caches[name] = cache
+    return cache
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def read_through(cache, key, loader):
+    """캐시에 없으면 loader() 결과를 저장 후 반환 (None은 저장하지 않음)"""
+    value = cache.get(key)
+    if value is None:
+        value = loader()
+        if value is not None:
+            cache.set(key, value)
+    return value
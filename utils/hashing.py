@@ -0,0 +1,79 @@
+"""
+비밀번호 해시 전용 스레드 풀.
+PBKDF2(hashlib)는 계산 중 GIL을 놓으므로 스레드로 실행되며, 풀 크기로 인증에 쓰는 CPU를 제한한다.
+대기 중인 작업이 한도를 넘으면 즉시 HashingOverloaded를 발생시켜 요청을 거절(load shedding)한다.
+
+gevent 워커(monkey patch)에서는 threading이 greenlet으로 바뀌어 일반 ThreadPoolExecutor가
+해시 계산 동안 워커 전체(모든 greenlet)를 멈추므로, gevent의 실제 OS 스레드 풀을 사용한다.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+import threading
+
+try:
+    from gevent import monkey
+    from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    monkey = None
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+
+class HashingOverloaded(Exception):
+    """해시 작업 대기열이 가득 찼거나 PASSWORD_HASH_TIMEOUT 안에 끝나지 않아 요청을 처리할 수 없음"""
+
+
+class PasswordHasher:
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING,
+                 method=PASSWORD_HASH_METHOD):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = method
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _executor_for_process(self):
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                if monkey is not None and monkey.is_module_patched('threading'):
+                    # 실제 스레드에서 계산하고, 기다리는 greenlet만 양보
+                    self._executor = GeventThreadPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._executor_pid = pid
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        try:
+            future = self._executor_for_process().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # 슬롯은 계산이 실제로 끝날 때 반납 (timeout으로 먼저 응답해도 계산 중인 작업은 한도에 포함)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+        except FutureTimeoutError:
+            raise HashingOverloaded() from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """저장된 해시의 방식/반복 횟수가 현재 설정과 다르면 True"""
+        return password_hash.split('$', 1)[0] != self.method
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,166 @@
+"""
+요청/DB 명령 계측과 Prometheus /metrics
+
+- pymongo CommandListener(models/db.py client_options에 등록)로 명령별 소요 시간과 요청당 명령 수/시간을 기록
+- Flask before/after_request 훅으로 엔드포인트(url rule)별 지연 시간 히스토그램 기록
+- SLOW_QUERY_MS 이상 걸린 DB 명령, SLOW_REQUEST_MS 이상 걸린 요청은 라우트와 함께 경고 로그
+- gunicorn 워커 여러 개의 값은 PROMETHEUS_MULTIPROC_DIR(gunicorn.conf.py에서 설정)로 합산해 노출
+
+prometheus_client가 없으면 /metrics는 503을 반환하고, 느린 쿼리 로그만 동작한다.
+"""
+from flask import Response, g, has_request_context, request
+from pymongo import monitoring
+import logging
+import os
+import threading
+import time
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                                   REGISTRY, generate_latest, multiprocess)
+except ImportError:  # pragma: no cover
+    Histogram = None
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))
+
+logger = logging.getLogger('metrics')
+
+if Histogram is not None:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', '엔드포인트별 요청 처리 시간',
+        ['method', 'endpoint', 'status'],
+        buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+    )
+    REQUEST_DB_COMMANDS = Histogram(
+        'http_request_db_commands', '요청당 MongoDB 명령 수',
+        ['method', 'endpoint'],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 500)
+    )
+    REQUEST_DB_SECONDS = Histogram(
+        'http_request_db_seconds', '요청당 MongoDB 명령 소요 시간 합계',
+        ['method', 'endpoint'],
+        buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+    )
+    DB_COMMAND_SECONDS = Histogram(
+        'mongodb_command_duration_seconds', 'MongoDB 명령별 소요 시간',
+        ['command', 'collection', 'status'],
+        buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 5)
+    )
+    CACHE_REQUESTS = Counter('cache_requests', '캐시 조회 수 (result=hit|miss)', ['cache', 'result'])
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'  # 실제 경로를 쓰면 라벨 수가 끝없이 늘어남
+
+
+def _query_shape(command_name, command):
+    """로그용 쿼리 형태 (값은 남기지 않고 필드명/단계명만)"""
+    if command_name == 'aggregate':
+        return [next(iter(stage), '') for stage in command.get('pipeline', [])]
+    for key in ('filter', 'q', 'query'):
+        if isinstance(command.get(key), dict):
+            return sorted(command[key])
+    for key in ('updates', 'deletes'):
+        if command.get(key):
+            return sorted(command[key][0].get('q', {}))
+    return None
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """명령을 실행한 스레드/greenlet에서 호출됨 (MongoClient는 CommandListener 하위 클래스만 받음)"""
+
+    def __init__(self):
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else '',
+                _query_shape(event.command_name, event.command)
+            )
+
+    def succeeded(self, event):
+        self._finish(event, 'ok')
+
+    def failed(self, event):
+        self._finish(event, 'error')
+
+    def _finish(self, event, status):
+        with self._lock:
+            collection, shape = self._started.pop((event.connection_id, event.request_id), ('', None))
+        seconds = event.duration_micros / 1e6
+
+        if Histogram is not None:
+            DB_COMMAND_SECONDS.labels(event.command_name, collection, status).observe(seconds)
+
+        route = None
+        if has_request_context():
+            g.db_commands = g.get('db_commands', 0) + 1
+            g.db_seconds = g.get('db_seconds', 0) + seconds
+            route = f'{request.method} {_endpoint()}'
+
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            logger.warning('slow query %.1fms %s.%s shape=%s route=%s',
+                           seconds * 1000, collection, event.command_name, shape, route)
+
+
+command_metrics = CommandMetrics()
+
+
+def record_cache(name, hit, count=1):
+    if Histogram is not None and count:
+        CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc(count)
+
+
+def event_listeners():
+    return [command_metrics] if METRICS_ENABLED else []
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.db_commands = 0
+    g.db_seconds = 0
+
+
+def _after_request(response):
+    started = g.get('request_started')
+    if started is None or request.path == '/metrics':
+        return response
+    seconds = time.perf_counter() - started
+    endpoint = _endpoint()
+
+    if Histogram is not None:
+        REQUEST_LATENCY.labels(request.method, endpoint, response.status_code).observe(seconds)
+        REQUEST_DB_COMMANDS.labels(request.method, endpoint).observe(g.db_commands)
+        REQUEST_DB_SECONDS.labels(request.method, endpoint).observe(g.db_seconds)
+
+    if seconds * 1000 >= SLOW_REQUEST_MS:
+        logger.warning('slow request %.1fms %s %s status=%s db_commands=%d db_time=%.1fms',
+                       seconds * 1000, request.method, endpoint, response.status_code,
+                       g.db_commands, g.db_seconds * 1000)
+    return response
+
+
+def metrics_view():
+    if Histogram is None:
+        return Response('prometheus_client is not installed\n', status=503, mimetype='text/plain')
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        # 모든 gunicorn 워커의 값을 합산
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,14 +1,78 @@
-from json import JSONEncoder
-from datetime import datetime
+from flask import Response, request
+from werkzeug.http import quote_etag
+from utils.serializer import dumps, iter_envelope
+import gzip
+import itertools
+import logging
+import os
+import zlib
+
+GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 5))
+
+logger = logging.getLogger(__name__)
+
+
+def _accepts_gzip():
+    return 'gzip' in request.accept_encodings
+
 
 def make_response(code, message, data=None):
-    if data:
-        def convert_datetime(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError("Type not serializable")
+    """
+    {'code', 'message', 'data'} 응답을 한 번만 직렬화해 반환.
+    ObjectId/datetime은 serializer가 변환하므로 라우트에서 str()/isoformat() 할 필요 없음.
+    """
+    body = dumps({'code': code, 'message': message, 'data': data})
+    response = Response(body, status=code, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_SIZE and _accepts_gzip():
+        response.set_data(gzip.compress(body, GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def etag_headers(tag):
+    """버전 기반 ETag 헤더. 클라이언트가 매번 If-None-Match로 재검증하도록 no-cache"""
+    return {'ETag': quote_etag(tag, weak=True), 'Cache-Control': 'private, no-cache'}
+
+
+def not_modified(tag):
+    """If-None-Match가 tag와 같으면 304 응답, 아니면 None"""
+    if not request.if_none_match.contains_weak(tag):
+        return None
+    return Response(status=304, headers=etag_headers(tag))
+
+
+def make_stream_response(code, message, items):
+    """
+    큰 목록을 항목 단위로 직렬화하며 전송 (필요 시 gzip 스트리밍 압축).
+    첫 항목은 응답 헤더를 보내기 전에 가져오므로 조회가 처음부터 실패하면 일반 오류 응답이 된다.
+    이후 실패는 200을 이미 보낸 뒤이므로 로그를 남기고 "error"를 붙여 JSON을 닫는다.
+    """
+    items = iter(items)
+    try:
+        first = next(items)
+    except StopIteration:
+        return make_response(code, message, [])
+
+    route = f'{request.method} {request.path}'  # 스트리밍 중에는 요청 컨텍스트가 없음
+
+    def on_error(exc):
+        logger.error('streamed response aborted: %s', route, exc_info=exc)
+        return {'code': 500, 'message': '목록을 전송하는 중 오류가 발생했습니다.'}
+
+    chunks = iter_envelope(code, message, itertools.chain([first], items), on_error=on_error)
+    headers = {'Vary': 'Accept-Encoding'}
+    if _accepts_gzip():
+        headers['Content-Encoding'] = 'gzip'
+        chunks = _gzip_stream(chunks)
+    return Response(chunks, status=code, mimetype='application/json', headers=headers)
 
-        from json import dumps
-        data = JSONEncoder(default=convert_datetime).encode(data)
 
-    return {'code': code, 'message': message, 'data': data}, code
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31: gzip 헤더 포함
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
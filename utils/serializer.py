@@ -0,0 +1,64 @@
+"""
+API 응답 JSON 직렬화.
+orjson이 설치되어 있으면 사용하고, 없으면 표준 json으로 동작한다.
+ObjectId는 문자열, datetime(UTC)은 기존 응답과 같은 'YYYY-MM-DDTHH:MM:SS.ffffffZ' 형식으로 변환한다.
+"""
+from bson import ObjectId
+from datetime import date, datetime, timezone
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        if obj.tzinfo is not None:
+            obj = obj.astimezone(timezone.utc).replace(tzinfo=None)
+        return obj.isoformat() + 'Z'
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f'Type not serializable: {type(obj).__name__}')
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+    def dumps(obj):
+        """obj -> JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(obj):
+        """obj -> JSON bytes"""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def backend():
+    return 'orjson' if orjson is not None else 'json'
+
+
+def iter_envelope(code, message, items, on_error=None):
+    """
+    {'code', 'message', 'data': [...]} 형태를 항목 단위로 나눠 직렬화 (큰 목록 스트리밍용).
+    항목을 가져오는 중 예외가 나면 on_error(exc)의 반환값을 "error"로 붙여 JSON을 닫는다 (on_error가 없으면 예외 전파)
+    """
+    yield dumps({'code': code, 'message': message})[:-1] + b',"data":['
+    first = True
+    try:
+        for item in items:
+            if not first:
+                yield b','
+            yield dumps(item)
+            first = False
+    except Exception as e:
+        if on_error is None:
+            raise
+        yield b'],"error":' + dumps(on_error(e)) + b'}'
+        return
+    yield b']}'
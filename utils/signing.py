@@ -0,0 +1,91 @@
+"""
+사진 URL 서명 (HMAC-SHA256, DB 조회 없이 검증)
+
+URL 형식: /uploads/<filename>?e=<만료 unix time>&k=<key id>&s=<서명>
+- PHOTO_URL_KEYS="<kid>:<secret>,<kid>:<secret>" 첫 번째 키로 서명하고 나머지는 검증에만 사용 (키 교체용)
+  설정이 없으면 SECRET_KEY를 사용 (앱 컨텍스트 안에서는 app.config, 밖에서는 환경 변수)
+- 만료 시각은 PHOTO_URL_BUCKET 단위로 올림하여, 같은 구간 안에서는 URL이 바뀌지 않아 브라우저 캐시가 유지된다
+"""
+from flask import current_app, has_app_context
+import base64
+import hashlib
+import hmac
+import math
+import os
+import time
+
+PHOTO_URL_SIGNING = os.getenv('PHOTO_URL_SIGNING', '1') == '1'
+PHOTO_URL_TTL = int(os.getenv('PHOTO_URL_TTL', 86400))
+PHOTO_URL_BUCKET = int(os.getenv('PHOTO_URL_BUCKET', 3600))
+
+
+def _load_keys():
+    keys = []
+    for item in os.getenv('PHOTO_URL_KEYS', '').split(','):
+        if ':' in item:
+            kid, secret = item.strip().split(':', 1)
+            keys.append((kid, secret.encode('utf-8')))
+    return keys
+
+
+_keys = None
+
+
+def _secret_key():
+    # routes/auth.secret_key()와 같은 규칙 (create_app(config)로 바꾼 값도 따르도록 캐시하지 않음)
+    if has_app_context():
+        return current_app.config.get('SECRET_KEY')
+    return os.getenv('SECRET_KEY')
+
+
+def keys():
+    global _keys
+    if _keys is None:
+        _keys = _load_keys()
+    if _keys:
+        return _keys
+    secret = _secret_key()
+    return [('0', secret.encode('utf-8'))] if secret else []
+
+
+def enabled():
+    return PHOTO_URL_SIGNING and bool(keys())
+
+
+def _signature(secret, filename, expires):
+    message = f'{filename}\n{expires}'.encode('utf-8')
+    digest = hmac.new(secret, message, hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def expires_at(now=None):
+    """지금 서명하면 붙는 만료 시각 (PHOTO_URL_BUCKET 단위로 바뀜, 서명 비활성화 시 0)"""
+    if not enabled():
+        return 0
+    now = now or time.time()
+    return int(math.ceil((now + PHOTO_URL_TTL) / PHOTO_URL_BUCKET) * PHOTO_URL_BUCKET)
+
+
+def sign(filename, now=None):
+    """서명 쿼리 파라미터 dict 반환 (서명 비활성화 시 빈 dict)"""
+    if not enabled():
+        return {}
+    expires = expires_at(now)
+    kid, secret = keys()[0]
+    return {'e': str(expires), 'k': kid, 's': _signature(secret, filename, expires)}
+
+
+def verify(filename, args, now=None):
+    """쿼리 파라미터(e, k, s)의 서명과 만료 시각 확인"""
+    if not enabled():
+        return True
+    try:
+        expires = int(args.get('e', ''))
+    except ValueError:
+        return False
+    if expires < (now or time.time()):
+        return False
+    secret = dict(keys()).get(args.get('k'))
+    if secret is None:
+        return False
+    return hmac.compare_digest(_signature(secret, filename, expires), args.get('s', ''))
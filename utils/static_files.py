@@ -0,0 +1,94 @@
+"""
+/uploads 정적 파일 응답.
+- 내용 해시 파일명(sha256)은 내용이 바뀌지 않으므로 immutable 캐시 + ETag
+- 서명된 URL은 private 캐시로, max-age를 서명 만료 시각까지로 제한 (공유 캐시가 만료 후에도 내려주지 않도록)
+- If-None-Match 일치 시 디스크 접근 없이 304
+- Range 요청은 send_file(conditional=True)이 처리
+- STATIC_OFFLOAD 설정 시 파일 전송을 앞단 웹 서버(nginx/apache)에 넘김
+- S3 저장소는 presigned URL로 리다이렉트
+- 서명(utils/signing.py)이 없거나 만료된 요청은 403
+"""
+from flask import Response, abort, redirect, request, send_file
+from urllib.parse import quote, urlencode
+from utils import signing, storage
+import mimetypes
+import os
+import re
+import time
+
+STATIC_OFFLOAD = os.getenv('STATIC_OFFLOAD', '')  # '', 'x-accel-redirect'(nginx), 'x-sendfile'(apache)
+STATIC_OFFLOAD_PREFIX = os.getenv('STATIC_OFFLOAD_PREFIX', '/protected-uploads')
+IMMUTABLE_MAX_AGE = 31536000
+UPLOAD_MAX_AGE = int(os.getenv('UPLOAD_MAX_AGE', 3600))
+
+_DIGEST_NAME = re.compile(r'^[0-9a-f]{64}')
+
+
+def is_content_addressed(filename):
+    return bool(_DIGEST_NAME.match(os.path.basename(filename)))
+
+
+def _apply_cache_headers(response, immutable, expires=None):
+    """expires: 서명 만료 시각 (서명된 요청일 때만)"""
+    response.cache_control.no_cache = None
+    max_age = IMMUTABLE_MAX_AGE if immutable else UPLOAD_MAX_AGE
+    if expires is None:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+        max_age = max(0, min(max_age, expires - int(time.time())))
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def _offload(store, filename, path, etag):
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    if STATIC_OFFLOAD == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = f'{STATIC_OFFLOAD_PREFIX}/{quote(os.path.relpath(path, store.root))}'
+    else:
+        response.headers['X-Sendfile'] = path
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def upload_url(filename):
+    """API 응답에 넣을 서명된 사진 URL"""
+    url = f"{request.host_url.rstrip('/')}/uploads/{quote(filename)}"
+    params = signing.sign(filename)
+    return f'{url}?{urlencode(params)}' if params else url
+
+
+def send_upload(filename):
+    if not signing.verify(filename, request.args):
+        abort(403)
+
+    expires = int(request.args['e']) if signing.enabled() else None
+    immutable = is_content_addressed(filename)
+    # 내용 해시 파일은 파일명 자체가 버전이므로 파일명을 ETag로 사용
+    etag = os.path.basename(filename) if immutable else None
+
+    if etag and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return _apply_cache_headers(response, immutable, expires)
+
+    store = storage.get_storage()
+    if store.name == 's3':
+        if not store.exists(filename):
+            abort(404)
+        response = redirect(store.url(filename))
+        response.cache_control.max_age = 300 if expires is None else max(0, min(300, expires - int(time.time())))
+        return response
+
+    path = store.local_path(filename)
+    if path is None:
+        abort(404)
+    if STATIC_OFFLOAD:
+        response = _offload(store, filename, path, etag)
+    else:
+        response = send_file(path, etag=etag or True)
+        response.headers['Accept-Ranges'] = 'bytes'
+    return _apply_cache_headers(response, immutable, expires)
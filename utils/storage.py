@@ -0,0 +1,233 @@
+"""
+업로드 파일 저장소.
+
+- LocalStorage: 파일명 해시 앞 4자리로 2단계 디렉터리(ab/cd/<파일명>)에 나눠 저장.
+  디렉터리 하나에 수백만 개의 파일이 쌓이지 않도록 하며, 이전의 평면(uploads/<파일명>) 배치도 읽을 수 있다.
+- S3Storage: S3 호환 오브젝트 스토리지 (STORAGE_S3_ENDPOINT_URL로 MinIO 등 로컬 대체 서버 사용 가능)
+
+STORAGE_BACKEND=local(기본)|s3 로 선택한다.
+"""
+from contextlib import contextmanager
+from werkzeug.security import safe_join
+import glob
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+try:
+    import boto3
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+CHUNK_SIZE = 1024 * 1024
+
+_DIGEST_NAME = re.compile(r'^[0-9a-f]{64}')
+
+
+def upload_folder():
+    folder = os.getenv('UPLOAD_FOLDER') or os.path.abspath(
+        os.path.join(os.path.dirname(__file__), '../uploads'))
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def hash_stream(stream):
+    """스트림을 청크 단위로 읽어 sha256 digest 계산 (디스크 쓰기 없음)"""
+    sha = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        sha.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return sha.hexdigest(), size
+
+
+def shard_key(filename):
+    """
+    'thumbs/<digest>_w256.jpg' -> 'thumbs/ab/cd/<digest>_w256.jpg'
+    내용 해시 파일명은 앞 4자리를, 그 외(이전 업로드)는 파일명의 sha256 앞 4자리를 사용
+    """
+    directory, name = os.path.split(filename)
+    digest = name if _DIGEST_NAME.match(name) else hashlib.sha256(name.encode('utf-8')).hexdigest()
+    return os.path.join(directory, digest[:2], digest[2:4], name)
+
+
+class LocalStorage:
+    name = 'local'
+
+    def __init__(self, root, sharded=True):
+        self.root = root
+        self.sharded = sharded
+
+    def key(self, filename):
+        return shard_key(filename) if self.sharded else filename
+
+    def _path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f'invalid filename: {key}')
+        return path
+
+    def local_path(self, filename):
+        """
+        실제 파일 경로. 마이그레이션 전의 평면 경로도 확인하며, 없으면 None.
+        (마이그레이션이 동시에 파일을 옮기는 경우를 위해 새 경로를 한 번 더 확인)
+        """
+        try:
+            sharded = self._path(self.key(filename))
+            flat = self._path(filename)
+        except ValueError:
+            return None
+        for path in (sharded, flat, sharded):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def relative_path(self, filename):
+        path = self.local_path(filename)
+        return os.path.relpath(path, self.root) if path else None
+
+    def exists(self, filename):
+        return self.local_path(filename) is not None
+
+    def temp_dir(self):
+        # 같은 파일 시스템에 임시 파일을 만들어 rename(os.replace)이 원자적으로 동작하도록 함
+        return self.root
+
+    def save_stream(self, stream, filename):
+        """임시 파일에 기록한 뒤 rename하여, 읽는 쪽이 쓰다 만 파일을 보지 않도록 저장"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                stream.seek(0)
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    out.write(chunk)
+            self.save_file(tmp_path, filename)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save_file(self, src_path, filename):
+        """로컬 파일을 저장소로 이동"""
+        os.chmod(src_path, 0o644)  # mkstemp 기본 권한(0600)이면 프록시 등에서 읽을 수 없음
+        dest = self._path(self.key(filename))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.replace(src_path, dest)
+        except OSError:
+            shutil.move(src_path, dest)
+
+    def remove(self, filename):
+        for path in {self._path(self.key(filename)), self._path(filename)}:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def remove_prefix(self, directory, prefix):
+        """directory 안에서 prefix로 시작하는 파일 삭제 (썸네일 정리용)"""
+        shard_dir = os.path.dirname(self.key(os.path.join(directory, prefix)))
+        for folder in {self._path(shard_dir), self._path(directory)}:
+            for path in glob.glob(os.path.join(glob.escape(folder), glob.escape(prefix) + '*')):
+                os.remove(path)
+
+    @contextmanager
+    def local_copy(self, filename):
+        yield self.local_path(filename)
+
+
+class S3Storage:
+    name = 's3'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, client=None):
+        """client: boto3 S3 클라이언트 호환 객체 (없으면 생성, 테스트에서는 가짜 클라이언트를 넘김)"""
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError('STORAGE_BACKEND=s3 를 사용하려면 boto3가 필요합니다.')
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client
+
+    def key(self, filename):
+        return self.prefix + shard_key(filename)
+
+    def exists(self, filename):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(filename))
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def temp_dir(self):
+        return tempfile.gettempdir()
+
+    def _extra_args(self, filename):
+        return {
+            'ContentType': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            'CacheControl': 'public, max-age=31536000, immutable',
+        }
+
+    def save_stream(self, stream, filename):
+        stream.seek(0)
+        self.client.upload_fileobj(stream, self.bucket, self.key(filename), ExtraArgs=self._extra_args(filename))
+
+    def save_file(self, src_path, filename):
+        self.client.upload_file(src_path, self.bucket, self.key(filename), ExtraArgs=self._extra_args(filename))
+        os.remove(src_path)
+
+    def remove(self, filename):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(filename))
+
+    def remove_prefix(self, directory, prefix):
+        key_prefix = self.key(os.path.join(directory, prefix))
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=key_prefix):
+            objects = [{'Key': item['Key']} for item in page.get('Contents', [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': objects})
+
+    def url(self, filename, expires_in=3600):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self.key(filename)}, ExpiresIn=expires_in)
+
+    @contextmanager
+    def local_copy(self, filename):
+        fd, tmp_path = tempfile.mkstemp(prefix='.s3-')
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self.key(filename), tmp_path)
+            yield tmp_path
+        finally:
+            os.remove(tmp_path)
+
+
+_storage = None
+_storage_pid = None
+_lock = threading.Lock()
+
+
+def create_storage():
+    backend = os.getenv('STORAGE_BACKEND', 'local')
+    if backend == 's3':
+        return S3Storage(
+            bucket=os.environ['STORAGE_S3_BUCKET'],
+            prefix=os.getenv('STORAGE_S3_PREFIX', ''),
+            endpoint_url=os.getenv('STORAGE_S3_ENDPOINT_URL') or None,
+            region=os.getenv('STORAGE_S3_REGION') or None
+        )
+    return LocalStorage(upload_folder(), sharded=os.getenv('STORAGE_LAYOUT', 'sharded') == 'sharded')
+
+
+def get_storage():
+    """프로세스당 하나의 저장소 객체 (boto3 클라이언트는 fork 이후 새로 생성)"""
+    global _storage, _storage_pid
+    pid = os.getpid()
+    with _lock:
+        if _storage is None or _storage_pid != pid:
+            _storage = create_storage()
+            _storage_pid = pid
+    return _storage
@@ -0,0 +1,58 @@
+import heapq
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    고정 윈도우 요청 제한 (워커 프로세스 단위).
+    key마다 window초 동안 limit번까지 허용한다.
+    워커마다 따로 세므로 실제 한도는 limit × 워커 수이고 재시작하면 초기화된다.
+    모든 워커가 같은 한도를 써야 하는 제한은 models/rate_limit.SharedRateLimiter를 사용
+    """
+
+    def __init__(self, limit, window, maxsize=100000):
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _counter(self, key, now):
+        started_at, count = self._counters.get(key, (now, 0))
+        if now - started_at >= self.window:
+            started_at, count = now, 0
+        return started_at, count
+
+    def retry_after(self, key):
+        """제한에 걸렸으면 다시 시도할 수 있을 때까지 남은 초, 아니면 0"""
+        now = time.monotonic()
+        with self._lock:
+            started_at, count = self._counter(key, now)
+            if count < self.limit:
+                return 0
+            return max(1, int(started_at + self.window - now))
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._counters) >= self.maxsize:
+                self._evict(now)
+            started_at, count = self._counter(key, now)
+            self._counters[key] = (started_at, count + 1)
+
+    def reset(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def _evict(self, now):
+        expired = [key for key, (started_at, _) in self._counters.items() if now - started_at >= self.window]
+        for key in expired:
+            del self._counters[key]
+        if len(self._counters) >= self.maxsize:
+            # 전부 비우면 새 key를 계속 만들어 다른 key의 카운터를 초기화할 수 있으므로 가장 오래된 것만 제거
+            # (한 번에 10%를 비워 매 요청마다 정렬하지 않도록 함)
+            overflow = len(self._counters) - self.maxsize + max(1, self.maxsize // 10)
+            oldest = heapq.nsmallest(overflow, self._counters.items(), key=lambda item: item[1][0])
+            for key, _ in oldest:
+                del self._counters[key]
@@ -0,0 +1,106 @@
+"""
+업로드 후 썸네일/반응형 이미지 생성 파이프라인.
+요청 처리 스레드를 막지 않도록 프로세스 풀에서 생성하고, 완료되면 콜백으로 결과를 기록한다.
+Pillow가 설치되어 있지 않으면 파이프라인은 비활성화된다.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+
+from utils import storage
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = [int(size) for size in os.getenv('THUMBNAIL_SIZES', '256,640,1280').split(',') if size]
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+THUMBNAIL_DIR = 'thumbs'
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def enabled():
+    return Image is not None and THUMBNAIL_WORKERS > 0
+
+
+def _executor_for_process():
+    """워커 프로세스마다 하나의 풀을 지연 생성 (fork 이전 풀은 재사용하지 않음)"""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    with _lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+            _executor_pid = pid
+    return _executor
+
+
+FORMATS = (
+    ('jpeg', 'jpg', {'quality': 85, 'progressive': True, 'optimize': True}),
+    ('webp', 'webp', {'quality': 80, 'method': 4}),
+)
+
+
+def render_variants(filename, digest, sizes):
+    """
+    (프로세스 풀에서 실행) 크기별 JPEG 썸네일과 WebP 변형을 생성해 저장소에 저장.
+    같은 내용(digest)의 결과가 이미 있으면 다시 만들지 않는다.
+    반환: [{'width', 'format', 'filename'}, ...]
+    """
+    store = storage.get_storage()
+    variants = []
+    missing = []
+    for size in sizes:
+        for fmt, ext, options in FORMATS:
+            variant = {'width': size, 'format': fmt, 'filename': f'{THUMBNAIL_DIR}/{digest}_w{size}.{ext}'}
+            variants.append(variant)
+            if not store.exists(variant['filename']):
+                missing.append((variant, options))
+
+    if missing:
+        with store.local_copy(filename) as source_path:
+            image = ImageOps.exif_transpose(Image.open(source_path)).convert('RGB')
+        for variant, options in missing:
+            resized = image.copy()
+            resized.thumbnail((variant['width'], variant['width']))
+            fd, tmp_path = tempfile.mkstemp(dir=store.temp_dir(), prefix='.thumb-')
+            os.close(fd)
+            try:
+                resized.save(tmp_path, format=variant['format'].upper(), **options)
+                store.save_file(tmp_path, variant['filename'])
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    return variants
+
+
+def submit(filename, digest, on_done):
+    """
+    썸네일 생성을 백그라운드로 예약. 완료 시 on_done(variants) 호출.
+    파이프라인이 비활성화되어 있으면 아무 것도 하지 않는다.
+    """
+    if not enabled():
+        return None
+
+    future = _executor_for_process().submit(render_variants, filename, digest, THUMBNAIL_SIZES)
+
+    def _callback(f):
+        try:
+            on_done(f.result())
+        except Exception:
+            logger.exception('썸네일 생성 실패: %s', filename)
+
+    future.add_done_callback(_callback)
+    return future
+
+
+def remove_variants(digest):
+    """원본 파일이 삭제될 때 같은 digest로 만들어진 썸네일도 함께 삭제"""
+    storage.get_storage().remove_prefix(THUMBNAIL_DIR, f'{digest}_w')
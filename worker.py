@@ -0,0 +1,111 @@
+"""
+백그라운드 작업 워커
+
+    python worker.py
+
+jobs 컬렉션(models/job.py)에서 작업을 가져와 처리한다. 여러 개를 띄워도 되고,
+처리 중 종료되어도 lease가 만료되면 다른 워커가 이어서 처리한다.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+from models.album import Album
+from models.blob import Blob
+from models.job import Job, LeaseLost
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', 200))
+
+logger = logging.getLogger('worker')
+
+job_service = Job()
+album_service = Album()
+blob_service = Blob()
+
+
+def delete_album(job):
+    """
+    앨범 연관 데이터 일괄 삭제 (멤버, 초대, 사진 + 파일/썸네일).
+    사진은 배치 단위로 처리하며, 배치 목록을 작업 문서(pending_release)에 먼저 기록해
+    중간에 중단되어도 다음 실행에서 파일 해제를 이어서 한다.
+    파일 해제는 사진 id 단위로 멱등(Blob.release)이므로, 같은 사진을 다시 해제해도 참조 카운트는 한 번만 줄어든다.
+    """
+    album_oid = job['payload']['album_id']
+    album_id = str(album_oid)
+    photos = album_service.db['photos']
+
+    # 등록 후 요청이 앨범을 지우기 전에 중단된 경우에도 앨범 문서까지 지워지도록 (이미 지워졌으면 무시됨)
+    if album_service.collection.delete_one({'_id': album_oid}).deleted_count:
+        album_service.invalidate_album(album_id)
+        album_service.user_service.bump_albums_version([job['payload']['requested_by']])
+    album_service.notify_pending_invitees(album_id)
+    album_service.member_collection.delete_many({'album_id': album_oid})
+    album_service.invite_collection.delete_many({'album_id': album_oid})
+
+    if 'photos_total' not in job.get('progress', {}):
+        job_service.heartbeat(job, {'$set': {
+            'progress.photos_total': photos.count_documents({'album_id': album_id}),
+            'progress.photos_deleted': 0
+        }})
+
+    pending = job.get('pending_release') or []
+    while True:
+        if not pending:
+            batch = list(photos.find({'album_id': album_id}, {'filename': 1, 'content_hash': 1}).limit(DELETE_BATCH_SIZE))
+            if not batch:
+                break
+            pending = [{'_id': doc['_id'], 'filename': doc['filename'], 'content_hash': doc.get('content_hash')} for doc in batch]
+            job_service.heartbeat(job, {'$set': {'pending_release': pending}})
+            photos.delete_many({'_id': {'$in': [doc['_id'] for doc in pending]}})
+
+        for doc in pending:
+            blob_service.release_photo(doc)
+            job_service.heartbeat(job, {
+                '$pull': {'pending_release': {'_id': doc['_id']}},
+                '$inc': {'progress.photos_deleted': 1}
+            })
+        pending = []
+
+
+HANDLERS = {
+    'delete_album': delete_album,
+}
+
+
+def run_forever():
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    logger.info('worker %s started', worker_id)
+
+    while not stopping:
+        job = job_service.claim(worker_id)
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        handler = HANDLERS.get(job['type'])
+        try:
+            if handler is None:
+                raise ValueError(f"unknown job type: {job['type']}")
+            handler(job)
+            job_service.complete(job)
+        except LeaseLost:
+            logger.warning('job %s (%s) lease lost, taken over by another worker', job['_id'], job['type'])
+        except Exception:
+            logger.exception('job %s (%s) failed', job['_id'], job['type'])
+            job_service.fail(job, traceback.format_exc(limit=5))
+        else:
+            logger.info('job %s (%s) done', job['_id'], job['type'])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    run_forever()